@@ -0,0 +1,283 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+"""
+Curve bootstrap benchmark.
+
+Generates synthetic instrument sets for every parse* form in increasing sizes
+and times, for each Piecewise engine, the three stages of a curve build:
+    parse      parseAll, i.e. helper construction
+    bootstrap  curve construction plus the lazy bootstrap (forced by dates())
+    query      the first discount query after the bootstrap
+Results are written as JSON, one record per (form, size, engine).
+
+    python -m examples.curve_builder_benchmark --sizes 10,50 --output bench.json
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+
+import QuantLib as ql
+import ext.CurveBuilder as builder
+import ext.DatetimeUtils as dfs
+
+AS_OF_DATE = 20121211
+BASIS = 'Act/365F'
+SIZES = [10, 25, 50, 100, 250, 500]
+ENGINES = [
+    'PiecewiseLogLinearDiscount',
+    'PiecewiseLogCubicDiscount',
+    'PiecewiseLinearZero',
+    'PiecewiseCubicZero',
+    'PiecewiseFlatForward',
+    'PiecewiseLinearForward',
+]
+
+
+# smooth upward sloping curve, t in years
+def marketRate(t):
+    return 0.01 + 0.02 * (1.0 - math.exp(-t / 5.0))
+
+
+def toYYYYMMDD(dt):
+    return dt.year() * 10000 + dt.month() * 100 + dt.dayOfMonth()
+
+
+def depositsForm1(n):
+    return {'Deposits': {
+        'settlementDays': 2,
+        'calendar': 'TGT',
+        'rolling': 'MF',
+        'basis': 'Act/360',
+        'month_end': False,
+        'marks': [['%dW' % (i + 1), marketRate((i + 1) / 52.0)] for i in range(n)]
+    }}
+
+
+def depositsForm2(n):
+    return {'Deposits': {
+        'index': 'Euribor',
+        'marks': [['%dW' % (i + 1), marketRate((i + 1) / 52.0)] for i in range(n)]
+    }}
+
+
+# fixing days a week apart keep the maturities distinct
+def depositsForm3(n):
+    return {'Deposits': {
+        'tenor': '1W',
+        'calendar': 'TGT',
+        'rolling': 'F',
+        'basis': 'Act/360',
+        'month_end': False,
+        'marks': [[5 * i, marketRate((i + 1) / 52.0)] for i in range(n)]
+    }}
+
+
+def fras(n):
+    return {'FRAs': {
+        'fixingDays': 2,
+        'calendar': 'TGT',
+        'rolling': 'MF',
+        'basis': 'Act/360',
+        'month_end': False,
+        'marks': [[i, i + 3, marketRate((i + 3) / 12.0)] for i in range(n)]
+    }}
+
+
+def frasIndex(n):
+    return {'FRAs': {
+        'index': 'Euribor,3M',
+        'marks': [[i + 1, marketRate((i + 4) / 12.0)] for i in range(n)]
+    }}
+
+
+# monthly IMM (third Wednesday) contracts
+def immDates(n):
+    dt = ql.IMM.nextDate(dfs.toQLDate(AS_OF_DATE) + 7, False)
+    dates = []
+    for i in range(n):
+        dates.append(dt)
+        dt = ql.IMM.nextDate(dt, False)
+
+    return dates
+
+
+def futures(n):
+    return {'Futures': {
+        'months': 3,
+        'calendar': 'TGT',
+        'rolling': 'MF',
+        'month_end': False,
+        'basis': 'Act/360',
+        'marks': [[toYYYYMMDD(dt), 100.0 * (1.0 - marketRate((i + 3) / 12.0))]
+                  for i, dt in enumerate(immDates(n))]
+    }}
+
+
+def futuresDated(n):
+    dates = immDates(n + 3)
+    return {'Futures': {
+        'basis': 'Act/360',
+        'marks': [[toYYYYMMDD(dates[i]), toYYYYMMDD(dates[i + 3]),
+                   100.0 * (1.0 - marketRate((i + 3) / 12.0))]
+                  for i in range(n)]
+    }}
+
+
+def swaps(n):
+    return {'Swaps': {
+        'iborIndex': 'Euribor,6M',
+        'fixedLegCalendar': 'TGT',
+        'fixedLegAdjustment': 'MF',
+        'fixedLegBasis': 'Act/360',
+        'fixedLegFrequency': 'Annual',
+        'marks': [['%dM' % (i + 12), marketRate((i + 12) / 12.0)] for i in range(n)]
+    }}
+
+
+def oiss(n):
+    return {'OISs': {
+        'settlementDays': 2,
+        'index': 'Eonia',
+        'marks': [['%dW' % (i + 1), marketRate((i + 1) / 52.0)] for i in range(n)]
+    }}
+
+
+def datedOISs(n):
+    start = dfs.toQLDate(AS_OF_DATE) + 2
+    marks = []
+    for i in range(n):
+        end = start + ql.Period(1, ql.Weeks)
+        marks.append([toYYYYMMDD(start), toYYYYMMDD(end),
+                      marketRate((i + 1) / 52.0)])
+        start = end
+
+    return {'OISs': {'index': 'Eonia', 'marks': marks}}
+
+
+# par bonds maturing a month apart
+def bonds(n):
+    asOfDate = dfs.toQLDate(AS_OF_DATE)
+    marks = []
+    for i in range(n):
+        maturity = asOfDate + ql.Period(i + 6, ql.Months)
+        marks.append([AS_OF_DATE, toYYYYMMDD(maturity),
+                      marketRate((i + 6) / 12.0), 100.0])
+
+    return {'Bonds': {
+        'basis': 'Act/365F',
+        'calendar': 'TGT',
+        'rolling': 'F',
+        'frequency': 'Semiannual',
+        'settlement_days': 0,
+        'face_amount': 100,
+        'month_end': False,
+        'marks': marks
+    }}
+
+
+FORMS = {
+    'deposits1': depositsForm1,
+    'deposits2': depositsForm2,
+    'deposits3': depositsForm3,
+    'fras': fras,
+    'frasIndex': frasIndex,
+    'futures': futures,
+    'futuresDated': futuresDated,
+    'swaps': swaps,
+    'oiss': oiss,
+    'datedOISs': datedOISs,
+    'bonds': bonds,
+}
+
+
+def timeBuild(engine, insts):
+    evalDate = dfs.toQLDate(AS_OF_DATE)
+    ql.Settings.instance().evaluationDate = evalDate
+    dayCount = builder.qlu.getDayCountBasis(BASIS)
+
+    start = time.perf_counter()
+    helpers = builder.parseAll(insts, evalDate)
+    parsed = time.perf_counter()
+    curve = getattr(ql, engine)(evalDate, helpers, dayCount)
+    curve.enableExtrapolation()
+    curve.dates()
+    bootstrapped = time.perf_counter()
+    curve.discount(curve.maxDate() - 1)
+    queried = time.perf_counter()
+
+    return {
+        'helpers': len(helpers),
+        'parse': parsed - start,
+        'bootstrap': bootstrapped - parsed,
+        'query': queried - bootstrapped
+    }
+
+
+def run(forms, sizes, engines, repeat=1):
+    results = []
+    for form in forms:
+        for size in sizes:
+            insts = FORMS[form](size)
+            for engine in engines:
+                rec = {'form': form, 'size': size, 'engine': engine}
+                try:
+                    # best of repeat runs
+                    runs = [timeBuild(engine, insts) for _ in range(repeat)]
+                    for stage in ('parse', 'bootstrap', 'query'):
+                        rec[stage] = min(r[stage] for r in runs)
+                    rec['helpers'] = runs[0]['helpers']
+                    rec['error'] = None
+                except RuntimeError as e:
+                    rec['error'] = str(e)
+                results.append(rec)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Curve bootstrap benchmark')
+    parser.add_argument('--forms', default=','.join(FORMS))
+    parser.add_argument('--sizes', default=','.join(str(n) for n in SIZES))
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default=None,
+                        help='JSON file, stdout if not given')
+    args = parser.parse_args(argv)
+
+    results = run(args.forms.split(','),
+                  [int(n) for n in args.sizes.split(',')],
+                  args.engines.split(','),
+                  args.repeat)
+    report = {
+        'quantlib': ql.__version__,
+        'python': platform.python_version(),
+        'asOfDate': AS_OF_DATE,
+        'results': results
+    }
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,30 +19,29 @@ http://gouthamanbalaraman.com/blog/value-treasury-futures-quantlib-python.html
 """
 import QuantLib as ql
 import matplotlib.pyplot as plt
-import datetime
 from matplotlib.ticker import FuncFormatter
 import ext.Config as config
 import ext.QuantLibClassExt as qlx
 import ext.CurveBuilder as builder
 import ext.BondFunctions as bfs
 import ext.CurveUtils as cutil
+import ext.DatetimeUtils as dfs
 
 
 def plot(lineType, dates, rates):
-    pydt = [datetime.datetime(d.year(), d.month(), d.dayOfMonth())
-            for d in dates]
     fig, ax = plt.subplots()
     fig.set_size_inches(10.5, 9.5)
     ax.yaxis.set_major_formatter(
         FuncFormatter(lambda r, pos: '{:.2%}'.format(r)))
     plt.subplots_adjust(bottom=0.2)
-    l, = plt.plot(pydt, rates, lineType)
+    l, = plt.plot(dates, rates, lineType)
     plt.show()
 
 
 def plotCurve(curve):
-    data = cutil.oneDayForwardRates(curve, '2Y', 'TGT', compounding='Simple')
-    plot('.', **data)
+    data = cutil.oneDayForwardRates(curve, '2Y', 'TGT', compounding='Simple',
+                                    asArrays=True)
+    plot('.', dfs.xlserials2datetime64s(data['dates']), data['rates'])
 
 
 def checkDiscountFactors(yield_curve):
@@ -12,6 +12,8 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import QuantLib as ql
 from . import DatetimeUtils as dfs
 from . import QuantLibUtils as qlu
@@ -802,3 +804,368 @@ def yieldRidder(*args):
 
 def yieldSecant(*args):
     return xbondYield('yieldSecant', *args)
+
+
+# =======================================================
+#     Portfolio analytics
+# =======================================================
+PORTFOLIO_FIELDS = ('cleanPrice', 'dirtyPrice', 'accruedAmount', 'yield',
+                    'duration', 'convexity', 'basisPointValue')
+
+
+def getDurationType(durationType):
+    if isinstance(durationType, str):
+        return getattr(ql.Duration, durationType.capitalize())
+
+    return durationType
+
+
+def broadcast(values, n, dtype=float):
+    values = np.asarray(values, dtype=dtype)
+    if values.ndim == 0:
+        return np.full(n, values, dtype=dtype)
+    if len(values) != n:
+        raise ValueError('Expected %d values, got %d' % (n, len(values)))
+
+    return values
+
+
+def toSettlementDates(settlementDates, n):
+    if settlementDates is None:
+        return [ql.Date()] * n
+    if isinstance(settlementDates, (int, np.integer, ql.Date)):
+        return [dfs.toQLDate(settlementDates)] * n
+    if len(settlementDates) != n:
+        raise ValueError('Expected %d settlement dates, got %d' % (n, len(settlementDates)))
+
+    return [dfs.toQLDate(dt) for dt in settlementDates]
+
+
+def bondAnalytics(bond, price, yld, settlementDate, dayCount, compounding,
+                  frequency, durationType, accuracy, maxIterations, guess):
+    if np.isnan(yld):
+        yld = ql.BondFunctions.bondYield(bond, price, dayCount, compounding,
+                                         frequency, settlementDate, accuracy,
+                                         maxIterations, guess)
+    rate = ql.InterestRate(yld, dayCount, compounding, frequency)
+    clean = ql.BondFunctions.cleanPrice(bond, rate, settlementDate)
+    accrued = ql.BondFunctions.accruedAmount(bond, settlementDate)
+
+    return (clean,
+            clean + accrued,
+            accrued,
+            yld,
+            ql.BondFunctions.duration(bond, rate, durationType, settlementDate),
+            ql.BondFunctions.convexity(bond, rate, settlementDate),
+            ql.BondFunctions.basisPointValue(bond, rate, settlementDate))
+
+
+def analyzeBonds(bonds, prices, yields, settlementDates, dayCount,
+                 compounding, frequency, durationType, accuracy,
+                 maxIterations, guess):
+    dayCount = qlu.getDayCountBasis(dayCount)
+    compounding = qlu.getCompoundType(compounding)
+    frequency = qlu.getFrequency(frequency)
+    durationType = getDurationType(durationType)
+
+    results = np.full((len(bonds), len(PORTFOLIO_FIELDS)), np.nan)
+    errors = {}
+    for i, bond in enumerate(bonds):
+        if np.isnan(prices[i]) and np.isnan(yields[i]):
+            continue
+        try:
+            results[i] = bondAnalytics(toBond(bond), prices[i], yields[i],
+                                       settlementDates[i], dayCount,
+                                       compounding, frequency, durationType,
+                                       accuracy, maxIterations, guess)
+        except RuntimeError as e:
+            errors[i] = str(e)
+
+    return results, errors
+
+
+def toBond(bond):
+    if isinstance(bond, tuple):
+        return qlx.XFixedRateBond(*bond)
+
+    return bond
+
+
+def initBondWorker(evalSerial):
+    ql.Settings.instance().evaluationDate = ql.Date(evalSerial)
+
+
+# settlement dates travel as serials, ql.Date can't be pickled
+def runShard(shard):
+    func, bonds, columns, serials, args = shard
+    dates = [ql.Date(serial) if serial > 0 else ql.Date() for serial in serials]
+    return func(bonds, *columns, dates, *args)
+
+
+# func(bonds, *columns, settlementDates, *args) -> (results, errors)
+def runBonds(func, bonds, columns, settlementDates, args, workers, chunkSize):
+    n = len(bonds)
+    if workers <= 1 or n <= chunkSize or not all(isinstance(b, tuple) for b in bonds):
+        return func(bonds, *columns, settlementDates, *args)
+
+    serials = [dt.serialNumber() for dt in settlementDates]
+    shards = [(func, list(bonds[i:i + chunkSize]),
+               [column[i:i + chunkSize] for column in columns],
+               serials[i:i + chunkSize], args)
+              for i in range(0, n, chunkSize)]
+    evalSerial = ql.Settings.instance().evaluationDate.serialNumber()
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=initBondWorker,
+                             initargs=(evalSerial,)) as executor:
+        parts = list(executor.map(runShard, shards))
+
+    errors = {}
+    for k, (_, part) in enumerate(parts):
+        errors.update({i + k * chunkSize: msg for i, msg in part.items()})
+
+    return np.vstack([part for part, _ in parts]), errors
+
+
+def portfolioAnalytics(bonds, dayCount, compounding, frequency,
+                       prices=None, yields=None, settlementDates=None,
+                       durationType='Modified', accuracy=1.0e-10,
+                       maxIterations=100, guess=0.05, workers=1,
+                       chunkSize=1000):
+    """
+    Price, yield and risk of a list of bonds at once. Either clean prices
+    (the yields are solved for) or yields are given, as arrays or scalars;
+    NaN entries are skipped. Settlement dates default to each bond's own.
+    Conventions are resolved once for the whole portfolio.
+
+    Returns a dict of numpy arrays keyed by PORTFOLIO_FIELDS plus 'errors',
+    {index: message} of the bonds QuantLib failed on (their results are NaN).
+
+    Bonds given as tuples of XFixedRateBond arguments, e.g.
+    (settlementDays, faceAmount, scheduleId, coupons, basis), are built on
+    demand and can be sharded over a pool of worker processes; QuantLib bond
+    objects can't be pickled and are always done in this process.
+    """
+    if (prices is None) == (yields is None):
+        raise ValueError('Either prices or yields must be given')
+
+    n = len(bonds)
+    prices = broadcast(np.nan if prices is None else prices, n)
+    yields = broadcast(np.nan if yields is None else yields, n)
+    settlementDates = toSettlementDates(settlementDates, n)
+    conventions = (dayCount, compounding, frequency, durationType, accuracy,
+                   maxIterations, guess)
+
+    results, errors = runBonds(analyzeBonds, bonds, [prices, yields],
+                               settlementDates, conventions, workers, chunkSize)
+
+    analytics = {name: results[:, j] for j, name in enumerate(PORTFOLIO_FIELDS)}
+    analytics['errors'] = errors
+
+    return analytics
+
+
+# =======================================================
+#     Batch yield solving
+# =======================================================
+# xbondYield method -> solver; bondYield is Brent in QuantLib
+YIELD_SOLVERS = {
+    'bondYield': ql.Brent,
+    'yieldBisection': ql.Bisection,
+    'yieldBrent': ql.Brent,
+    'yieldFalsePosition': ql.FalsePosition,
+    'yieldNewton': ql.Newton,
+    'yieldNewtonSafe': ql.NewtonSafe,
+    'yieldRidder': ql.Ridder,
+    'yieldSecant': ql.Secant,
+}
+DEFAULT_GUESS = 0.05
+
+
+def getYieldSolver(method):
+    if method not in YIELD_SOLVERS:
+        raise ValueError('Unknown yield method: %s' % method)
+
+    return YIELD_SOLVERS[method]()
+
+
+class YieldObjective(object):
+    # clean price at a yield minus the target, counting the evaluations;
+    # derivative() is what the Newton solvers need
+    def __init__(self, bond, price, dayCount, compounding, frequency, settlementDate):
+        self.bond = bond
+        self.price = price
+        self.dayCount = dayCount
+        self.compounding = compounding
+        self.frequency = frequency
+        self.settlementDate = settlementDate
+        self.evaluations = 0
+
+    def rate(self, yld):
+        return ql.InterestRate(yld, self.dayCount, self.compounding, self.frequency)
+
+    def __call__(self, yld):
+        self.evaluations += 1
+        return ql.BondFunctions.cleanPrice(self.bond, self.rate(yld),
+                                           self.settlementDate) - self.price
+
+    def derivative(self, yld):
+        self.evaluations += 1
+        return ql.BondFunctions.basisPointValue(self.bond, self.rate(yld),
+                                                self.settlementDate) * 1.0e4
+
+
+def solveYields(bonds, prices, guesses, settlementDates, method, dayCount,
+                compounding, frequency, accuracy, maxIterations):
+    dayCount = qlu.getDayCountBasis(dayCount)
+    compounding = qlu.getCompoundType(compounding)
+    frequency = qlu.getFrequency(frequency)
+
+    results = np.full((len(bonds), 2), np.nan)
+    errors = {}
+    for i, bond in enumerate(bonds):
+        if np.isnan(prices[i]):
+            continue
+        guess = DEFAULT_GUESS if np.isnan(guesses[i]) else guesses[i]
+        solver = getYieldSolver(method)
+        solver.setMaxEvaluations(maxIterations)
+        objective = YieldObjective(toBond(bond), prices[i], dayCount,
+                                   compounding, frequency, settlementDates[i])
+        try:
+            # QuantLib's bracketing step
+            yld = solver.solve(objective, accuracy, guess, abs(guess) / 10.0 or 0.001)
+            results[i] = (yld, objective.evaluations)
+        except RuntimeError as e:
+            results[i, 1] = objective.evaluations
+            errors[i] = str(e)
+
+    return results, errors
+
+
+def curveGuesses(bonds, curve, dayCount, compounding, frequency):
+    # zero rates of the curve to the bonds' maturities
+    dayCount = qlu.getDayCountBasis(dayCount)
+    compounding = qlu.getCompoundType(compounding)
+    frequency = qlu.getFrequency(frequency)
+
+    return np.array([curve.zeroRate(toBond(bond).maturityDate(), dayCount,
+                                    compounding, frequency, True).rate()
+                     for bond in bonds])
+
+
+def bondYields(bonds, prices, dayCount, compounding, frequency,
+               method='yieldBrent', guesses=None, settlementDates=None,
+               accuracy=1.0e-10, maxIterations=100, workers=1, chunkSize=1000):
+    """
+    Yields of a list of bonds from their clean prices, by one of the
+    xbondYield methods. guesses are the starting points, e.g. the previous
+    run's yields or curveGuesses(); NaN or missing guesses start from 0.05.
+
+    Returns {'yield': array, 'evaluations': array, 'errors': {index: message}};
+    evaluations counts the price (and derivative) evaluations per bond.
+    Bonds are given and sharded as for portfolioAnalytics.
+    """
+    getYieldSolver(method)
+
+    n = len(bonds)
+    prices = broadcast(prices, n)
+    guesses = broadcast(np.nan if guesses is None else guesses, n)
+    settlementDates = toSettlementDates(settlementDates, n)
+    args = (method, dayCount, compounding, frequency, accuracy, maxIterations)
+
+    results, errors = runBonds(solveYields, bonds, [prices, guesses],
+                               settlementDates, args, workers, chunkSize)
+
+    return {
+        'yield': results[:, 0],
+        'evaluations': results[:, 1].astype(int),
+        'errors': errors
+    }
+
+
+# =======================================================
+#     Curve pricing from cash flow tables
+# =======================================================
+KEY_RATE_TENORS = ('1Y', '2Y', '3Y', '5Y', '7Y', '10Y', '20Y', '30Y')
+
+
+# triangular weights of the key rates at the times t; each key's weight
+# peaks at its own time and fades to the neighbouring keys, flat beyond
+# the first and last ones
+def keyRateWeights(t, keyTimes):
+    weights = np.zeros((len(t), len(keyTimes)))
+    for k in range(len(keyTimes)):
+        weights[:, k] = np.interp(t, keyTimes, np.eye(len(keyTimes))[k])
+
+    return weights
+
+
+def curvePrices(bonds, curve, settlementDates=None, keyRateTenors=KEY_RATE_TENORS,
+                shift=1.0e-4, cashFlows=None):
+    """
+    Dirty and clean prices (per 100 notional), BPV and key rate BPVs of
+    fixed rate bonds off one curve. The cash flows of all the bonds are
+    discounted with one discount factor per distinct date, then summed per
+    bond; the results match cleanPrice(bond, curve, settlementDate).
+    Settlement dates default to each bond's own; ex-coupon periods are not
+    supported. Extracting the cash flows dominates a single run, so pass
+    cashFlows=qlx.cashFlowTables(bonds) when pricing the same bonds off
+    several curves or scenarios.
+
+    BPV is the dirty price change for a parallel shift (1bp) of the
+    continuously compounded zero rates, key rate BPVs for triangular shifts
+    around keyRateTenors from the curve's reference date. Each is a full
+    reprice, so the key rate BPVs add up to the BPV only approximately, to
+    first order in the shift.
+    """
+    if not isinstance(curve, qlx.TermStructDecorator):
+        curve = qlx.TermStructDecorator(curve)
+    bonds = [toBond(bond) for bond in bonds]
+    n = len(bonds)
+    settlementDates = [bond.settlementDate() if dt == ql.Date() else dt
+                       for bond, dt in zip(bonds, toSettlementDates(settlementDates, n))]
+    settles = np.array([dt.serialNumber() for dt in settlementDates], dtype=np.int32)
+
+    table = qlx.cashFlowTables(bonds) if cashFlows is None else cashFlows
+    alive = table['date'] > settles[table['bond']]
+    owners = table['bond'][alive]
+    amounts = table['amount'][alive]
+
+    # one discount factor per distinct date, settlement dates included
+    serials, index = np.unique(np.concatenate([table['date'][alive], settles]),
+                               return_inverse=True)
+    flowIndex, settleIndex = index[:len(owners)], index[len(owners):]
+    dfs_ = curve.discounts(serials)
+    refDate = curve.referenceDate()
+    dayCount = curve.dayCounter()
+    t = np.array([dayCount.yearFraction(refDate, ql.Date(int(s))) for s in serials])
+
+    # matured bonds have no notional left and get NaN prices
+    notionals = np.array([bond.notional(dt) for bond, dt in zip(bonds, settlementDates)])
+    notionals[notionals == 0.0] = np.nan
+    accrued = np.array([ql.BondFunctions.accruedAmount(bond, dt)
+                        for bond, dt in zip(bonds, settlementDates)])
+
+    def dirtyPrices(discounts):
+        npvs = np.bincount(owners, weights=amounts * discounts[flowIndex], minlength=n)
+        return npvs / discounts[settleIndex] * 100.0 / notionals
+
+    dirty = dirtyPrices(dfs_)
+    bpv = dirtyPrices(dfs_ * np.exp(-shift * t)) - dirty
+
+    tenors = [] if keyRateTenors is None else list(keyRateTenors)
+    keyTimes = [dayCount.yearFraction(refDate, refDate + qlu.parseTenor(tenor))
+                for tenor in tenors]
+    keyRates = np.zeros((n, len(tenors)))
+    if len(tenors) > 0:
+        weights = keyRateWeights(t, keyTimes)
+        for k in range(len(tenors)):
+            keyRates[:, k] = dirtyPrices(dfs_ * np.exp(-shift * weights[:, k] * t)) - dirty
+
+    return {
+        'dirtyPrice': dirty,
+        'cleanPrice': dirty - accrued,
+        'accruedAmount': accrued,
+        'basisPointValue': bpv,
+        'keyRates': keyRates,
+        'keyRateTenors': tenors
+    }
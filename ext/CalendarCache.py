@@ -0,0 +1,108 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+# Binary cache of parsed calendar files (Calendar.idx and *.cal).
+#
+# Every source file is cached as one .npy file in config.getCacheDir().
+# The source's mtime and size are stored in the first row of the array,
+# so a cache file is only used while its source is unchanged, and it is
+# replaced atomically when rebuilt. Holiday arrays are memory-mapped.
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+from . import Config as config
+
+
+def getCachePath(srcPath, kind):
+    srcPath = os.path.abspath(srcPath)
+    digest = hashlib.sha1(srcPath.encode('utf-8')).hexdigest()[:12]
+    fileName = '%s.%s.%s.npy' % (os.path.basename(srcPath), digest, kind)
+    return os.path.join(config.getCacheDir(), fileName)
+
+
+def getSourceKey(srcPath):
+    st = os.stat(srcPath)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def writeArray(cachePath, arr):
+    cacheDir = os.path.dirname(cachePath)
+    os.makedirs(cacheDir, exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=cacheDir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, arr, allow_pickle=False)
+        os.chmod(tmpPath, 0o644)
+        os.replace(tmpPath, cachePath)
+    except BaseException:
+        os.remove(tmpPath)
+        raise
+
+
+def readArray(cachePath, mmap):
+    try:
+        return np.load(cachePath, mmap_mode='r' if mmap else None,
+                       allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+
+# holidays as an int64 array, parse(srcPath) is called on a cache miss
+def loadHolidays(srcPath, parse):
+    key = getSourceKey(srcPath)
+    cachePath = getCachePath(srcPath, 'holidays')
+    arr = readArray(cachePath, mmap=True)
+    if arr is not None and arr.ndim == 1 and len(arr) >= 2 \
+            and (int(arr[0]), int(arr[1])) == key:
+        return arr[2:]
+
+    days = np.asarray(parse(srcPath), dtype=np.int64)
+    try:
+        writeArray(cachePath, np.concatenate((np.array(key, dtype=np.int64), days)))
+    except OSError:
+        pass  # read-only cache dir, keep working uncached
+
+    return days
+
+
+# calendar index rows [code, name, url], parse(srcPath) is called on a cache miss
+def loadIndex(srcPath, parse):
+    key = getSourceKey(srcPath)
+    header = ['#', str(key[0]), str(key[1])]
+    cachePath = getCachePath(srcPath, 'index')
+    arr = readArray(cachePath, mmap=False)
+    if arr is not None and arr.ndim == 2 and len(arr) >= 1 \
+            and list(arr[0]) == header:
+        return arr[1:].tolist()
+
+    rows = [[c.strip() for c in row] for row in parse(srcPath)]
+    try:
+        writeArray(cachePath, np.array([header] + rows, dtype=str))
+    except OSError:
+        pass
+
+    return rows
+
+
+def clear():
+    cacheDir = config.getCacheDir()
+    if not os.path.isdir(cacheDir):
+        return
+
+    for fileName in os.listdir(cacheDir):
+        if fileName.endswith('.npy'):
+            os.remove(os.path.join(cacheDir, fileName))
@@ -13,8 +13,22 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 
+import threading
+
 from . import Config as config
 from . import Utils as utils
+from . import CalendarCache as calCache
+
+
+def parseIndex(reader):
+    # skip the first two rows
+    next(reader)
+    next(reader)
+    return [row for row in reader]
+
+
+def parseIndexFile(path):
+    return parseIndex(utils.loadCSVFromFile(path))
 
 
 class CalendarIndex:
@@ -23,11 +37,12 @@ class CalendarIndex:
             self.calIndex = {}
 
             url = config.getCalendarIndexURL()
-            reader = utils.loadCSVFromUrl(url)
-            # skip the first two rows
-            next(reader)
-            next(reader)
-            for row in reader:
+            path = utils.urlToPath(url)
+            if path is not None and config.isCalendarCacheEnabled():
+                rows = calCache.loadIndex(path, parseIndexFile)
+            else:
+                rows = parseIndex(utils.loadCSVFromUrl(url))
+            for row in rows:
                 self.calIndex[row[0].strip().upper()] = (
                     row[1].strip(), row[2].strip())
 
@@ -49,10 +64,13 @@ class CalendarIndex:
             return repr(self) + ' Calendar Index'
 
     instance = None
+    lock = threading.Lock()
 
     def __init__(self):
         if not CalendarIndex.instance:
-            CalendarIndex.instance = CalendarIndex.__CalendarIndex()
+            with CalendarIndex.lock:
+                if not CalendarIndex.instance:
+                    CalendarIndex.instance = CalendarIndex.__CalendarIndex()
 
     def __getattr__(self, name):
         return getattr(self.instance, name)
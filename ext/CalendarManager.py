@@ -13,16 +13,37 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 
+import threading
 import QuantLib as ql
 from . import DatetimeUtils as dfs
+from . import Utils as utils
 from .URLCalendarLoader import URLCalendarLoader
 from .CalendarIndex import CalendarIndex
+from .CompiledCalendar import CompiledCalendar
+from .LRUCache import LRUCache
+from . import Instrumentation as inst
+
+# rough memory footprint of a calendar, used by the cache policy: a fixed
+# part plus a std::set node per added holiday (kept by buildCustomCalendar,
+# built-in calendars have none)
+CALENDAR_BYTES = 512
+HOLIDAY_BYTES = 48
+
+
+def calendarBytes(cal):
+    return CALENDAR_BYTES + HOLIDAY_BYTES * len(getattr(cal, 'holidays', ()))
+
+
+def compiledCalendarBytes(compiled):
+    return compiled.bitmap.nbytes + compiled.cumCount.nbytes
 
 
 class CalendarManager:
     class __CalendarManager:
         def __init__(self, loader=None):
-            self.calCache = {}
+            self.calCache = LRUCache(sizeOf=calendarBytes)
+            self.compiledCache = LRUCache(sizeOf=compiledCalendarBytes)
+            self.buildLocks = utils.KeyedLocks()
             if loader is None:
                 self.loader = URLCalendarLoader()
             else:
@@ -34,13 +55,38 @@ class CalendarManager:
         def getLoader(self):
             return self.loader
 
-        def buildCustomCalendar(self, calName):
+        # maxEntries/maxBytes bound the calendar cache and compiledMaxEntries/
+        # compiledMaxBytes the compiled calendar one, whose entries are far
+        # bigger; ttl (seconds) forces a reload of both after holiday
+        # updates. The caches keep their entries and stats.
+        def setCachePolicy(self, maxEntries=None, maxBytes=None, ttl=None,
+                           compiledMaxEntries=None, compiledMaxBytes=None):
+            self.calCache.setPolicy(maxEntries, maxBytes, ttl)
+            self.compiledCache.setPolicy(compiledMaxEntries, compiledMaxBytes, ttl)
+
+        def getCacheStats(self):
+            return {
+                'calendars': self.calCache.stats(),
+                'compiled': self.compiledCache.stats()
+            }
+
+        def reloadCalendar(self, calName):
+            calName = calName.upper()
+            with self.buildLocks.hold(calName):
+                self.calCache.pop(calName)
+                self.compiledCache.pop(calName)
+                return self.getCalendar(calName)
+
+        def buildCustomCalendar(self, calName, days=None):
             cal = ql.BespokeCalendar(calName)
             cal.addWeekend(ql.Saturday)
             cal.addWeekend(ql.Sunday)
-            days = self.loader.load(calName)
+            if days is None:
+                days = self.loader.load(calName)
             for day in days:
                 cal.addHoliday(dfs.toQLDate(int(day)))
+            # kept to compile the calendar without asking QuantLib for them
+            cal.holidays = list(days)
 
             return cal
 
@@ -66,9 +112,22 @@ class CalendarManager:
 
             # calName = str(calName)
             calName = calName.upper()
-            if calName in self.calCache:
-                return self.calCache[calName]
+            cal = self.calCache.get(calName)
+            if cal is not None:
+                inst.count('calendar.hits')
+                return cal
 
+            inst.count('calendar.misses')
+            # only one thread builds a given calendar, the others wait for it
+            with self.buildLocks.hold(calName):
+                cal = self.calCache.peek(calName)
+                if cal is not None:
+                    return cal
+
+                with inst.stage('calendar.create', calName=calName):
+                    return self.createCalendar(calName)
+
+        def createCalendar(self, calName):
             calIndex = CalendarIndex()
             calInfo = calIndex.getCalInfo(calName)
             if calInfo is None:
@@ -85,20 +144,79 @@ class CalendarManager:
                 cal = self.initBuiltCalendar(calInfo[0])
 
             if cal is not None:
-                self.calCache[calName] = cal
+                self.calCache.put(calName, cal)
 
             return cal
 
+        def getCompiledCalendar(self, calName):
+            if isinstance(calName, CompiledCalendar):
+                return calName
+
+            if isinstance(calName, ql.Calendar):
+                return CompiledCalendar.fromCalendar(calName)
+
+            calName = calName.upper()
+            compiled = self.compiledCache.get(calName)
+            if compiled is not None:
+                return compiled
+
+            with self.buildLocks.hold(calName):
+                cal = self.getCalendar(calName)
+                if cal is None:
+                    return None
+
+                # compiled on first request only
+                compiled = self.compiledCache.peek(calName)
+                if compiled is None:
+                    if hasattr(cal, 'holidays'):
+                        compiled = CompiledCalendar(calName, cal.holidays)
+                    else:
+                        compiled = CompiledCalendar.fromCalendar(cal)
+                    self.compiledCache.put(calName, compiled)
+
+                return compiled
+
+        # loads (and compiles) the given calendars, all the ones in
+        # Calendar.idx by default, and returns the time spent per code
+        def preload(self, codes=None, parallel=True, maxWorkers=None):
+            calIndex = CalendarIndex()
+            if codes is None:
+                codes = calIndex.getIndex().keys()
+            codes = [code.upper() for code in codes]
+
+            # loaders able to do it fetch all the holidays at once
+            holidays = {}
+            if hasattr(self.loader, 'loadMany'):
+                custom = [code for code in codes
+                          if calIndex.getCalInfo(code) is not None and
+                          len(calIndex.getCalInfo(code)[1].strip()) > 0]
+                holidays = self.loader.loadMany(custom)
+
+            def load(calName):
+                if calName in holidays:
+                    with self.buildLocks.hold(calName):
+                        if self.calCache.peek(calName) is None:
+                            cal = self.buildCustomCalendar(
+                                calName, holidays[calName])
+                            self.calCache.put(calName, cal)
+                return self.getCompiledCalendar(calName)
+
+            return utils.timedCalls(load, codes, parallel, maxWorkers)
+
         def __str__(self):
             return repr(self) + 'Impl of CalendarManager'
 
     instance = None
+    lock = threading.Lock()
 
     def __init__(self, loader=None):
         if not CalendarManager.instance:
-            CalendarManager.instance = CalendarManager.__CalendarManager(
-                loader)
-        elif loader is not None:
+            with CalendarManager.lock:
+                if not CalendarManager.instance:
+                    CalendarManager.instance = CalendarManager.__CalendarManager(
+                        loader)
+                    return
+        if loader is not None:
             CalendarManager.instance.setLoader(loader)
 
     def __getattr__(self, name):
@@ -113,3 +231,25 @@ def getCalendar(calName):
     calMgr = CalendarManager()
     cal = calMgr.getCalendar(calName)
     return cal
+
+
+def setCachePolicy(maxEntries=None, maxBytes=None, ttl=None,
+                   compiledMaxEntries=None, compiledMaxBytes=None):
+    calMgr = CalendarManager()
+    calMgr.setCachePolicy(maxEntries, maxBytes, ttl,
+                          compiledMaxEntries, compiledMaxBytes)
+
+
+def reloadCalendar(calName):
+    calMgr = CalendarManager()
+    return calMgr.reloadCalendar(calName)
+
+
+def getCompiledCalendar(calName):
+    calMgr = CalendarManager()
+    return calMgr.getCompiledCalendar(calName)
+
+
+def preload(codes=None, parallel=True, maxWorkers=None):
+    calMgr = CalendarManager()
+    return calMgr.preload(codes, parallel, maxWorkers)
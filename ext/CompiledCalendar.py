@@ -0,0 +1,154 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+import numpy as np
+import QuantLib as ql
+from . import DatetimeUtils as dfs
+
+# The valid serial range in QuantLib: January 1st, 1901 - December 31st, 2199
+MIN_SERIAL = 367
+MAX_SERIAL = 109574
+
+
+class CompiledCalendar(object):
+    """Business day bitmap over serials [367, 109574] plus a cumulative
+    business day count, answering isBusinessDay, advance(n, Days) and
+    businessDaysBetween in O(1) without calling into QuantLib.
+
+    Dates can be ql.Date, yyyymmdd or Excel serials, either scalars or
+    arrays. Dates are returned as Excel serials (ql.Date for a ql.Date
+    scalar input).
+    """
+
+    def __init__(self, name, holidays, weekends=(ql.Saturday, ql.Sunday)):
+        self.name = name
+        serials = np.arange(MIN_SERIAL, MAX_SERIAL + 1, dtype=np.int64)
+        # same as ql.Date.weekday(): Sunday = 1, ..., Saturday = 7
+        weekdays = serials % 7
+        weekdays[weekdays == 0] = 7
+        isBusinessDay = ~np.isin(weekdays, list(weekends))
+
+        holidays = dfs.numbers2xlserials(holidays) if len(holidays) > 0 \
+            else np.empty(0, dtype=np.int64)
+        holidays = holidays[(holidays >= MIN_SERIAL) &
+                            (holidays <= MAX_SERIAL)]
+        isBusinessDay[holidays - MIN_SERIAL] = False
+
+        self.bitmap = np.packbits(isBusinessDay)
+        # cumCount[i] is the number of business days in [367, 367 + i)
+        self.cumCount = np.zeros(len(serials) + 1, dtype=np.int32)
+        np.cumsum(isBusinessDay, out=self.cumCount[1:])
+
+    @classmethod
+    def fromCalendar(cls, calendar):
+        # compiles any QuantLib calendar, weekends included in the holidays
+        days = calendar.holidayList(ql.Date(MIN_SERIAL),
+                                    ql.Date(MAX_SERIAL - 1), True)
+        holidays = [d.serialNumber() for d in days]
+        if not calendar.isBusinessDay(ql.Date(MAX_SERIAL)):
+            holidays.append(MAX_SERIAL)
+
+        return cls(calendar.name(), holidays, weekends=())
+
+    def toIndex(self, dates):
+        isScalar = isinstance(dates, ql.Date) or np.isscalar(dates)
+        isQLDate = isinstance(dates, ql.Date)
+        if isScalar:
+            dates = [dates]
+        dates = np.asarray(dates)
+        if dates.dtype == object:
+            dates = np.array([dt.serialNumber() if isinstance(dt, ql.Date) else dt
+                              for dt in dates.tolist()], dtype=np.int64)
+        serials = dfs.numbers2xlserials(dates)
+        if serials.size > 0 and (serials.min() < MIN_SERIAL or serials.max() > MAX_SERIAL):
+            raise ValueError("Date outside allowed range [%d-%d]" %
+                             (MIN_SERIAL, MAX_SERIAL))
+
+        return serials - MIN_SERIAL, isScalar, isQLDate
+
+    def toResult(self, idx, isScalar, isQLDate):
+        serials = idx + MIN_SERIAL
+        if not isScalar:
+            return serials
+        if isQLDate:
+            return ql.Date(int(serials[0]))
+
+        return int(serials[0])
+
+    def isBusinessDayAt(self, idx):
+        return ((self.bitmap[idx >> 3] >> (7 - (idx & 7))) & 1).astype(bool)
+
+    def isBusinessDay(self, dates):
+        idx, isScalar, _ = self.toIndex(dates)
+        res = self.isBusinessDayAt(idx)
+        return bool(res[0]) if isScalar else res
+
+    def isHoliday(self, dates):
+        idx, isScalar, _ = self.toIndex(dates)
+        res = ~self.isBusinessDayAt(idx)
+        return bool(res[0]) if isScalar else res
+
+    # =======================================================
+    # Date advance(const Date&, Integer n, TimeUnit unit = Days,
+    #      BusinessDayConvention convention = Following)
+    # -------------------------------------------------------
+    # Only Days are supported: n > 0 (n < 0) moves to the n-th business
+    # day after (before) the date, n = 0 rolls forward to a business day.
+    # =======================================================
+    def advance(self, dates, n):
+        idx, isScalar, isQLDate = self.toIndex(dates)
+        n = np.asarray(n, dtype=np.int64)
+        # position of the wanted business day in the cumulative count
+        target = np.where(n > 0,
+                          self.cumCount[idx + 1] + n,
+                          self.cumCount[idx] + n + 1)
+        if np.any(target < 1) or np.any(target > self.cumCount[-1]):
+            raise ValueError("Date advanced outside allowed range [%d-%d]" %
+                             (MIN_SERIAL, MAX_SERIAL))
+        res = np.searchsorted(self.cumCount, target, side='left') - 1
+
+        return self.toResult(res, isScalar, isQLDate)
+
+    def adjust(self, dates):
+        return self.advance(dates, 0)
+
+    # =======================================================
+    # Date::serial_type businessDaysBetween(const Date& from,
+    #      const Date& to,
+    #      bool includeFirst = true,
+    #      bool includeLast = false)
+    # =======================================================
+    def businessDaysBetween(self, fromDates, toDates, includeFirst=True, includeLast=False):
+        fromIdx, isScalar, _ = self.toIndex(fromDates)
+        toIdx, isToScalar, _ = self.toIndex(toDates)
+        isScalar = isScalar and isToScalar
+        fromIdx, toIdx = np.broadcast_arrays(fromIdx, toIdx)
+        lo = np.minimum(fromIdx, toIdx)
+        hi = np.maximum(fromIdx, toIdx)
+        fromIsBD = self.isBusinessDayAt(fromIdx)
+        toIsBD = self.isBusinessDayAt(toIdx)
+
+        wd = (self.cumCount[hi + 1] - self.cumCount[lo]).astype(np.int64)
+        if not includeFirst:
+            wd -= fromIsBD
+        if not includeLast:
+            wd -= toIsBD
+        wd = np.where(fromIdx > toIdx, -wd, wd)
+        same = 1 if includeFirst and includeLast else 0
+        wd = np.where(fromIdx == toIdx, fromIsBD * same, wd)
+
+        return int(wd[0]) if isScalar else wd
+
+    def __str__(self):
+        return repr(self) + ' Compiled calendar ' + self.name
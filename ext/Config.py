@@ -29,6 +29,19 @@ def setDBConnectInfo(
     os.environ['DB_NAME'] = database
 
 
+def setDBPoolInfo(size, idleTimeout=300):
+    os.environ['DB_POOL_SIZE'] = str(size)
+    os.environ['DB_POOL_IDLE_TIMEOUT'] = str(idleTimeout)
+
+
+def getDBPoolSize():
+    return int(os.getenv('DB_POOL_SIZE', 5))
+
+
+def getDBPoolIdleTimeout():
+    return float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+
+
 def setCurveDir(crvDir):
     os.environ['CURVE_DIR'] = crvDir
 
@@ -41,6 +54,14 @@ def setCalendarDir(calDir):
     os.environ['CALENDAR_DIR'] = calDir
 
 
+def setCacheDir(cacheDir):
+    os.environ['CACHE_DIR'] = cacheDir
+
+
+def enableCalendarCache(flag=True):
+    os.environ['CALENDAR_CACHE'] = '1' if flag else '0'
+
+
 def getCurrentDir():
     path = Path(__file__).parent.absolute()
     return path
@@ -83,6 +104,35 @@ def getCalendarDir():
     return calDir
 
 
+def getCacheDir():
+    cacheDir = os.getenv('CACHE_DIR', None)
+    if cacheDir is None:
+        cacheDir = os.path.join(getParentDir(), 'cache')
+
+    return cacheDir
+
+
+def isCalendarCacheEnabled():
+    return os.getenv('CALENDAR_CACHE', '1') != '0'
+
+
+def enableInstrumentation(flag=True):
+    os.environ['INSTRUMENTATION'] = '1' if flag else '0'
+
+
+def isInstrumentationEnabled():
+    return os.getenv('INSTRUMENTATION', '0') != '0'
+
+
+# resolve QuantLibConfig.json when QuantLibUtils is imported
+def enablePreResolve(flag=True):
+    os.environ['PRE_RESOLVE_CONFIG'] = '1' if flag else '0'
+
+
+def isPreResolveEnabled():
+    return os.getenv('PRE_RESOLVE_CONFIG', '0') != '0'
+
+
 def getCalendarIndexURL():
     url = 'file:///' + os.path.join(getConfigDir(), 'Calendar.idx')
     return url
@@ -0,0 +1,143 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool(object):
+    """Pool of DB-API connections made by connect().
+
+    At most maxSize connections are open at a time, acquire() waits for
+    one to be released beyond that. Idle connections are closed after
+    idleTimeout seconds, by a daemon reaper thread started with the first
+    release, and checked with healthCheck (an SQL statement) before being
+    handed out again.
+    """
+
+    def __init__(self, connect, maxSize=5, idleTimeout=300, healthCheck='SELECT 1'):
+        self.connect = connect
+        self.maxSize = maxSize
+        self.idleTimeout = idleTimeout
+        self.healthCheck = healthCheck
+        self.cond = threading.Condition()
+        self.idle = []  # (connection, time released)
+        self.size = 0
+        self.reaper = None
+
+    def isHealthy(self, conn):
+        if self.healthCheck is None:
+            return True
+        try:
+            c = conn.cursor()
+            c.execute(self.healthCheck)
+            c.fetchall()
+            c.close()
+            return True
+        except Exception:
+            return False
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        while True:
+            with self.cond:
+                while not self.idle and self.size >= self.maxSize:
+                    self.cond.wait()
+                if self.idle:
+                    conn, released = self.idle.pop()
+                else:
+                    self.size += 1
+                    conn = None
+
+            if conn is None:
+                try:
+                    return self.connect()
+                except BaseException:
+                    self.release(None)
+                    raise
+
+            if time.monotonic() - released < self.idleTimeout and self.isHealthy(conn):
+                return conn
+            self.discard(conn)
+            self.release(None)
+
+    # conn = None gives back the slot of a connection that was discarded
+    def release(self, conn, broken=False):
+        if conn is not None and broken:
+            self.discard(conn)
+            conn = None
+        with self.cond:
+            if conn is None:
+                self.size -= 1
+            else:
+                self.idle.append((conn, time.monotonic()))
+                if self.reaper is None and self.idleTimeout is not None:
+                    self.reaper = threading.Thread(target=self.reap, daemon=True)
+                    self.reaper.start()
+            self.cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, broken=True)
+            raise
+        self.release(conn)
+
+    # closes the connections idle for longer than idleTimeout
+    def closeStale(self):
+        limit = time.monotonic() - self.idleTimeout
+        with self.cond:
+            stale = [conn for conn, released in self.idle if released <= limit]
+            self.idle = [(conn, released) for conn, released in self.idle
+                         if released > limit]
+            self.size -= len(stale)
+            self.cond.notify_all()
+        for conn in stale:
+            self.discard(conn)
+
+    def reap(self):
+        while True:
+            time.sleep(max(self.idleTimeout / 2.0, 0.1))
+            self.closeStale()
+
+    def closeIdle(self):
+        with self.cond:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+            self.cond.notify_all()
+        for conn, _ in idle:
+            self.discard(conn)
+
+
+pools = {}
+poolsLock = threading.Lock()
+
+
+# pool shared by everyone asking for the same name
+def getPool(name, connect, maxSize=5, idleTimeout=300, healthCheck='SELECT 1'):
+    with poolsLock:
+        if name not in pools:
+            pools[name] = ConnectionPool(
+                connect, maxSize, idleTimeout, healthCheck)
+
+        return pools[name]
@@ -13,6 +13,10 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 from functools import wraps  # This convenience func preserves name and docstring
+import os
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
 import QuantLib as ql
 from . import QuantLibUtils as qlu
 from . import DatetimeUtils as dfs
@@ -20,6 +24,14 @@ from . import CalendarManager as mgr
 from . import Utils as utils
 from . import QuantLibClassExt as qlx
 from . import CurveReqLoaders as crvLoder
+from . import CurveSnapshot as snapshot
+from . import Instrumentation as inst
+from .LRUCache import LRUCache
+
+# built curves keyed by (engine, as-of date, basis, calendar,
+# extrapolation, instruments hash)
+CURVE_CACHE_SIZE = 64
+curveCache = LRUCache(maxEntries=CURVE_CACHE_SIZE)
 
 # decorator to add methods to a class on the fly
 
@@ -34,6 +46,42 @@ def add_method(cls):
         return func  # returning func means func can still be used normally
     return decorator
 
+# Market quotes. With a quotes dict, every mark is wrapped in a named
+# SimpleQuote registered under its mark id, so that the curve can be
+# re-bootstrapped by setting quote values instead of re-parsing helpers.
+
+
+def markName(instType, recIdx, *keys):
+    return '%s.%d.%s' % (instType, recIdx, 'x'.join(str(k) for k in keys))
+
+
+def makeQuote(quotes, markId, value, wrap=False):
+    if quotes is None:
+        if wrap:
+            return ql.QuoteHandle(ql.SimpleQuote(value))
+        return value
+
+    quote = ql.SimpleQuote(value)
+    quotes[markId] = quote
+    return ql.QuoteHandle(quote)
+
+
+# Curve dependencies. A record may name another curve of the set as its
+# discountingCurve (swaps, OISs) or forwardingCurve (swap ibor index);
+# curves maps curve names to their (relinkable) handles.
+def getCurveHandle(curves, name):
+    if curves is None or name not in curves:
+        raise RuntimeError("Curve %s was not found!" % name)
+
+    return curves[name]
+
+
+def getDiscountingHandle(rec, curves):
+    if 'discountingCurve' in rec:
+        return getCurveHandle(curves, rec['discountingCurve'])
+
+    return ql.YieldTermStructureHandle()
+
 # DepositRateHelper
 
 
@@ -57,7 +105,7 @@ DepositRateHelper   (
 """
 
 
-def parseDeposits(data):
+def parseDeposits(data, quotes=None):
     if data is None:
         return None
 
@@ -66,9 +114,9 @@ def parseDeposits(data):
     if not isinstance(data, list):
         data = [data]
 
-    for rec in data:
+    for i, rec in enumerate(data):
         if 'index' in rec:  # form 2
-            temp = [ql.DepositRateHelper(rate,
+            temp = [ql.DepositRateHelper(makeQuote(quotes, markName('Deposits', i, tenor), rate),
                                          qlu.getMarketIndex(
                                              rec['index'] + ',' + tenor)
                                          )
@@ -84,7 +132,7 @@ def parseDeposits(data):
             # uncessary to use Quote: ql.QuoteHandle(ql.SimpleQuote(r))
             for mark in rec['marks']:
                 fixingDays = mark[0]
-                r = mark[1]
+                r = makeQuote(quotes, markName('Deposits', i, fixingDays), mark[1])
                 temp = ql.DepositRateHelper(r,
                                             tenor,
                                             fixingDays,
@@ -101,7 +149,7 @@ def parseDeposits(data):
             # uncessary to use Quote: ql.QuoteHandle(ql.SimpleQuote(r))
             for mark in rec['marks']:
                 fixingDays = mark[0]
-                r = mark[1]
+                r = makeQuote(quotes, markName('Deposits', i, fixingDays), mark[1])
                 fixingDays = dfs.parseTenor(fixingDays)
                 settlementDays = rec['settlementDays']
                 temp = ql.DepositRateHelper(
@@ -168,7 +216,7 @@ FraRateHelper   (
 """
 
 
-def parseFRAs(data):
+def parseFRAs(data, quotes=None):
     if data is None:
         return None
 
@@ -177,12 +225,12 @@ def parseFRAs(data):
     if not isinstance(data, list):
         data = [data]
 
-    for rec in data:
+    for i, rec in enumerate(data):
         if 'index' in rec:
             index = qlu.getMarketIndex(rec['index'])
             for mark in rec['marks']:
                 monthsToStart = mark[0]
-                rate = mark[1]
+                rate = makeQuote(quotes, markName('FRAs', i, mark[0]), mark[1])
                 if isinstance(monthsToStart, str):
                     monthsToStart = dfs.parseTenor(monthsToStart)
 
@@ -197,7 +245,7 @@ def parseFRAs(data):
             for mark in rec['marks']:
                 monthsToStart = mark[0]
                 monthsToEnd = mark[1]
-                r = mark[2]
+                r = makeQuote(quotes, markName('FRAs', i, monthsToStart, monthsToEnd), mark[2])
 
                 helper = ql.FraRateHelper(r,
                                           monthsToStart,
@@ -247,7 +295,7 @@ FuturesRateHelper   (
 """
 
 
-def parseFutures(data):
+def parseFutures(data, quotes=None):
     if data is None:
         return None
 
@@ -256,10 +304,11 @@ def parseFutures(data):
     if not isinstance(data, list):
         data = [data]
 
-    for rec in data:
+    for i, rec in enumerate(data):
         if 'index' in rec:
             iborIndex = qlu.getMarketIndex(rec['index'])
-            temp = [ql.FuturesRateHelper(rate, dfs.toQLDate(iborStartDate), iborIndex)
+            temp = [ql.FuturesRateHelper(makeQuote(quotes, markName('Futures', i, iborStartDate), rate),
+                                         dfs.toQLDate(iborStartDate), iborIndex)
                     for iborStartDate, rate in rec['marks']]
             helpers.extend(temp)
         elif 'months' in rec:
@@ -270,10 +319,13 @@ def parseFutures(data):
             dayCount = qlu.getDayCountBasis(rec['basis'])
             for mark in rec['marks']:
                 iborStartDate = mark[0]
-                r = mark[1]
+                r = makeQuote(quotes, markName('Futures', i, iborStartDate), mark[1])
                 convexityAdjustment = 0.0
                 if len(mark) > 2:
                     convexityAdjustment = mark[2]
+                if quotes is not None:  # the quote overloads take a handle
+                    convexityAdjustment = ql.QuoteHandle(
+                        ql.SimpleQuote(convexityAdjustment))
 
                 helper = ql.FuturesRateHelper(r,
                                               dfs.toQLDate(iborStartDate),
@@ -289,7 +341,7 @@ def parseFutures(data):
             for mark in rec['marks']:
                 iborStartDate = mark[0]
                 iborEndDate = mark[1]
-                r = mark[2]
+                r = makeQuote(quotes, markName('Futures', i, iborStartDate, iborEndDate), mark[2], wrap=True)
                 convexityAdjustment = 0.0
                 if len(mark) > 3:
                     convexityAdjustment = mark[3]
@@ -335,7 +387,7 @@ SwapRateHelper  (
 """
 
 
-def parseSwaps(data):
+def parseSwaps(data, quotes=None, curves=None):
     if data is None:
         return None
 
@@ -344,9 +396,13 @@ def parseSwaps(data):
     if not isinstance(data, list):
         data = [data]
 
-    for rec in data:
+    for i, rec in enumerate(data):
         if 'iborIndex' in rec:
-            floatIndex = qlu.getMarketIndex(rec['iborIndex'])
+            forwardingCurve = None
+            if 'forwardingCurve' in rec:
+                forwardingCurve = getCurveHandle(curves, rec['forwardingCurve'])
+            floatIndex = qlu.getMarketIndex(rec['iborIndex'], forwardingCurve)
+            discountingCurve = getDiscountingHandle(rec, curves)
             fixedCalendar = mgr.getCalendar(rec["fixedLegCalendar"])
 
             fixedLegFrequency = qlu.getFrequency(rec["fixedLegFrequency"])
@@ -355,16 +411,19 @@ def parseSwaps(data):
 
             for mark in rec['marks']:
                 periodLength = dfs.parseTenor(mark[0])
-                rate = mark[1]
+                rate = makeQuote(quotes, markName('Swaps', i, mark[0]), mark[1], wrap=True)
 
                 temp = ql.SwapRateHelper(
-                    ql.QuoteHandle(ql.SimpleQuote(rate)),
+                    rate,
                     periodLength,
                     fixedCalendar,
                     fixedLegFrequency,
                     fixedLegAdjustment,
                     fixedLegDayCounter,
-                    floatIndex  # ql.Euribor6M()
+                    floatIndex,  # ql.Euribor6M()
+                    ql.QuoteHandle(),
+                    ql.Period(0, ql.Days),
+                    discountingCurve
                 )
 
                 helpers.append(temp)
@@ -406,7 +465,7 @@ DatedOISRateHelper  (
 """
 
 
-def parseOISs(data):
+def parseOISs(data, quotes=None, curves=None):
     if data is None:
         return None
 
@@ -415,20 +474,24 @@ def parseOISs(data):
     if not isinstance(data, list):
         data = [data]
 
-    for rec in data:
+    for i, rec in enumerate(data):
         if 'settlementDays' in rec:  # form 2
             settlementDays = rec['settlementDays']
             index = qlu.getMarketIndex(rec['index'])
-            temp = [ql.OISRateHelper(settlementDays, dfs.parseTenor(tenor), ql.QuoteHandle(ql.SimpleQuote(rate)), index) for
+            discountingCurve = getDiscountingHandle(rec, curves)
+            temp = [ql.OISRateHelper(settlementDays, dfs.parseTenor(tenor),
+                                     makeQuote(quotes, markName('OISs', i, tenor), rate, wrap=True),
+                                     index, discountingCurve) for
                     tenor, rate in rec['marks']]
             helpers.extend(temp)
         else:
             index = qlu.getMarketIndex(rec['index'])
+            discountingCurve = getDiscountingHandle(rec, curves)
 
             temp = [ql.DatedOISRateHelper(dfs.toQLDate(start_date),
                                           dfs.toQLDate(end_date),
-                                          ql.QuoteHandle(ql.SimpleQuote(rate)),
-                                          index)
+                                          makeQuote(quotes, markName('OISs', i, start_date, end_date), rate, wrap=True),
+                                          index, discountingCurve)
                     for start_date, end_date, rate in rec['marks']]
             helpers.extend(temp)
 
@@ -457,7 +520,7 @@ FixedRateBondHelper (
 """
 
 
-def parseBonds(data, calc_date=None, rule=None):
+def parseBonds(data, calc_date=None, rule=None, quotes=None):
     if calc_date is None:
         calc_date = ql.Date.todaysDate()
     else:
@@ -471,7 +534,7 @@ def parseBonds(data, calc_date=None, rule=None):
     bond_helpers = []
 
     rule = qlu.getDateGenRule(rule)
-    for instList in data:
+    for i, instList in enumerate(data):
         day_count = qlu.getDayCountBasis(instList['basis'])
         calendar = mgr.getCalendar(instList["calendar"])
         rolling = qlu.getRollingConv(instList['rolling'])
@@ -480,9 +543,9 @@ def parseBonds(data, calc_date=None, rule=None):
         face_amount = instList['face_amount']
         eom = instList['month_end']
 
-        for issue_date, maturity_date, coupon, price in instList['marks']:
+        for issue_date, maturity, coupon, price in instList['marks']:
             issue_date = dfs.toQLDate(issue_date)
-            maturity_date = dfs.toQLDate(maturity_date)
+            maturity_date = dfs.toQLDate(maturity)
             schedule = ql.Schedule(calc_date,
                                    maturity_date,
                                    frequency,
@@ -492,7 +555,8 @@ def parseBonds(data, calc_date=None, rule=None):
                                    rule,
                                    eom)
 
-            helper = ql.FixedRateBondHelper(ql.QuoteHandle(ql.SimpleQuote(price)),
+            price = makeQuote(quotes, markName('Bonds', i, maturity), price, wrap=True)
+            helper = ql.FixedRateBondHelper(price,
                                             settlement_days,
                                             face_amount,
                                             schedule,
@@ -505,21 +569,37 @@ def parseBonds(data, calc_date=None, rule=None):
     return bond_helpers
 
 
-def parseAll(insts, calc_date=None):
+INSTRUMENT_TYPES = ('Deposits', 'OISs', 'FRAs', 'Futures', 'Swaps', 'Bonds')
+
+
+def parseInstruments(instType, data, calc_date=None, quotes=None, curves=None):
+    if instType == 'Deposits':
+        return parseDeposits(data, quotes)
+    elif instType == 'OISs':
+        return parseOISs(data, quotes, curves)
+    elif instType == 'FRAs':
+        return parseFRAs(data, quotes)
+    elif instType == 'Futures':
+        return parseFutures(data, quotes)
+    elif instType == 'Swaps':
+        return parseSwaps(data, quotes, curves)
+    elif instType == 'Bonds':
+        return parseBonds(data, calc_date, quotes=quotes)
+
+    return []
+
+
+def parseAll(insts, calc_date=None, quotes=None, curves=None):
     helpers = []
-    for instType in insts.keys():
-        if instType == 'Deposits':
-            helpers.extend(parseDeposits(insts[instType]))
-        elif instType == 'OISs':
-            helpers.extend(parseOISs(insts[instType]))
-        elif instType == 'FRAs':
-            helpers.extend(parseFRAs(insts[instType]))
-        elif instType == 'Futures':
-            helpers.extend(parseFutures(insts[instType]))
-        elif instType == 'Swaps':
-            helpers.extend(parseSwaps(insts[instType]))
-        elif instType == 'Bonds':
-            helpers.extend(parseBonds(insts[instType], calc_date))
+    with inst.stage('parseAll'):
+        for instType in insts.keys():
+            if instType not in INSTRUMENT_TYPES:
+                continue
+            with inst.stage('parse', instType=instType):
+                temp = parseInstruments(instType, insts[instType],
+                                        calc_date, quotes, curves)
+                inst.count('helpers.' + instType, len(temp))
+            helpers.extend(temp)
 
     return helpers
 
@@ -540,22 +620,93 @@ curveEngine:
 """
 
 
-def buildCurve(curveEngine, asOfDate, basis, insts, calendar=None, enableExtrapolation=True):
-    engineRef = getattr(ql, curveEngine)
-    if engineRef is None:
-        raise RuntimeError("Curve engine %s was not found!" % curveEngine)
+def setCurveCachePolicy(maxEntries=CURVE_CACHE_SIZE, ttl=None):
+    global curveCache
+    curveCache = LRUCache(maxEntries=maxEntries, ttl=ttl)
+
 
-    evalDate = dfs.toQLDate(asOfDate)
+def clearCurveCache():
+    curveCache.clear()
+
+
+def getCurveCacheStats():
+    return curveCache.stats()
+
+
+def hashInstruments(insts):
+    text = json.dumps(insts, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def curveCacheKey(curveEngine, evalDate, basis, insts, calendar, enableExtrapolation):
+    return (curveEngine, evalDate.serialNumber(), basis, calendar,
+            bool(enableExtrapolation), hashInstruments(insts))
+
+
+def buildCurve(curveEngine, asOfDate, basis, insts, calendar=None, enableExtrapolation=True, useCache=True, curves=None):
+    with inst.stage('buildCurve', engine=curveEngine, asOfDate=str(asOfDate)):
+        engineRef = getattr(ql, curveEngine)
+        if engineRef is None:
+            raise RuntimeError("Curve engine %s was not found!" % curveEngine)
+
+        evalDate = dfs.toQLDate(asOfDate)
+        # curves are bootstrapped lazily against the evaluation date, so set it
+        # even when the curve comes from the cache
+        ql.Settings.instance().evaluationDate = evalDate
+        # the key can't tell what the curves the instruments refer to hold
+        useCache = useCache and curves is None
+        if useCache:
+            key = curveCacheKey(curveEngine, evalDate, basis, insts,
+                                calendar, enableExtrapolation)
+            crv = curveCache.get(key)
+            if crv is not None:
+                inst.count('curveCache.hits')
+                return crv
+            inst.count('curveCache.misses')
+
+        curve = makeCurve(engineRef, evalDate, basis, insts,
+                          calendar, enableExtrapolation, curves=curves)
+        if curve is not None:
+            crv = qlx.TermStructDecorator(curve, curveEngine, basis, calendar,
+                                          'Turns' in insts)
+            if useCache:
+                curveCache.put(key, crv)
+            return crv
+        else:
+            return None
+
+
+# bootstraps the piecewise curve; the marks are registered in quotes if given
+def makeCurve(engineRef, evalDate, basis, insts, calendar=None, enableExtrapolation=True, quotes=None, curves=None):
     dayCountBasis = qlu.getDayCountBasis(basis)
-    ql.Settings.instance().evaluationDate = evalDate
-    helpers = parseAll(insts, asOfDate)
+    helpers = parseAll(insts, evalDate, quotes, curves)
     jump_values = None
     jump_dates = None
     if 'Turns' in insts:
         jump_dates = [dfs.toQLDate(dt) for dt in insts["Turns"]['days']]
-        jump_values = [ql.QuoteHandle(ql.SimpleQuote(v))
-                       for v in insts["Turns"]['values']]
+        jump_values = [makeQuote(quotes, markName('Turns', 0, dt), v, wrap=True)
+                       for dt, v in zip(insts["Turns"]['days'], insts["Turns"]['values'])]
+
+    with inst.stage('construct'):
+        curve = constructCurve(engineRef, evalDate, dayCountBasis, helpers,
+                               jump_values, jump_dates, calendar)
+    if enableExtrapolation:
+        curve.enableExtrapolation()
+
+    # bootstrapping is lazy; force it to time it. A failure is recorded and
+    # raised again by the first query, as it would be without instrumentation
+    if inst.isEnabled():
+        with inst.stage('bootstrap', helpers=len(helpers)):
+            try:
+                curve.dates()
+            except RuntimeError as e:
+                inst.count('bootstrap.failures')
+                inst.setError(e)
+
+    return curve
+
 
+def constructCurve(engineRef, evalDate, dayCountBasis, helpers, jump_values=None, jump_dates=None, calendar=None):
     if calendar is None:
         if jump_dates is None or jump_values is None:
             curve = engineRef(evalDate,
@@ -582,55 +733,306 @@ def buildCurve(curveEngine, asOfDate, basis, insts, calendar=None, enableExtrapo
                               dayCountBasis,
                               jump_values,
                               jump_dates)
-    if enableExtrapolation:
-        curve.enableExtrapolation()
 
-    if curve is not None:
-        return qlx.TermStructDecorator(curve)
-    else:
-        return None
+    return curve
+
+
+class LiveCurve(qlx.TermStructDecorator):
+    """
+    A curve whose marks are kept as named SimpleQuotes. update() only sets
+    quote values; QuantLib re-bootstraps lazily on the next query.
+    Mark ids are '<instType>.<record index>.<mark key>', e.g. 'Swaps.0.10Y';
+    see quoteIds().
+    """
+
+    def __init__(self, curveEngine, asOfDate, basis, insts, calendar=None, enableExtrapolation=True):
+        engineRef = getattr(ql, curveEngine)
+        if engineRef is None:
+            raise RuntimeError("Curve engine %s was not found!" % curveEngine)
+
+        self.evalDate = dfs.toQLDate(asOfDate)
+        ql.Settings.instance().evaluationDate = self.evalDate
+        self.quotes = {}
+        curve = makeCurve(engineRef, self.evalDate, basis, insts,
+                          calendar, enableExtrapolation, self.quotes)
+        super().__init__(curve, curveEngine, basis, calendar, 'Turns' in insts)
+
+    def quoteIds(self):
+        return list(self.quotes.keys())
+
+    def quoteValues(self):
+        return {markId: quote.value() for markId, quote in self.quotes.items()}
+
+    def update(self, marks):
+        for markId in marks:
+            if markId not in self.quotes:
+                raise RuntimeError("mark %s was not found" % markId)
+
+        ql.Settings.instance().evaluationDate = self.evalDate
+        for markId, value in marks.items():
+            self.quotes[markId].setValue(value)
+
+
+def loadAndBuild(curveEngine, asOfDate, basis, curveId, loader, calendar=None, enableExtrapolation=True):
+    with inst.stage('curve', curveId=curveId):
+        with inst.stage('loader.load', curveId=curveId):
+            insts = loader.load(curveId)
+        return buildCurve(curveEngine, asOfDate, basis, insts, calendar, enableExtrapolation)
 
 
 def PiecewiseCubicZeroCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseCubicZero', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseCubicZero', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseFlatForwardCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseFlatForward', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseFlatForward', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseFlatHazardRateCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseFlatHazardRate', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseFlatHazardRate', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseLinearForwardCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseLinearForward', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseLinearForward', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseLinearZeroCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseLinearZero', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseLinearZero', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseLogCubicDiscountCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseLogCubicDiscount', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseLogCubicDiscount', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseLogLinearDiscountCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseLogLinearDiscount', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseLogLinearDiscount', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseYoYInflationCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseYoYInflation', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseYoYInflation', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
 
 
 def PiecewiseZeroInflationCurve(asOfDate, basis, curveId, loader=crvLoder.FileCurveReqLoader(), calendar=None, enableExtrapolation=True):
-    insts = loader.load(curveId)
-    return buildCurve('PiecewiseZeroInflation', asOfDate, basis, insts, calendar, enableExtrapolation)
+    return loadAndBuild('PiecewiseZeroInflation', asOfDate, basis, curveId, loader, calendar, enableExtrapolation)
+
+
+# Parallel builds. buildCurve sets the global evaluation date, so curves are
+# built in worker processes and shipped back as CurveSnapshot node data,
+# which is reloaded in the parent without re-solving.
+# A request is a dict with keys curveEngine, asOfDate, basis, either insts or
+# curveId (loaded in the parent with loader) and optionally calendar,
+# enableExtrapolation and, within a CurveSet, dependsOn.
+
+CALENDAR_KEYS = ('calendar', 'fixedLegCalendar')
+CURVE_REF_KEYS = ('discountingCurve', 'forwardingCurve')
+
+
+def findValues(insts, keys, found=None):
+    if found is None:
+        found = set()
+    if isinstance(insts, dict):
+        for key, value in insts.items():
+            if key in keys and isinstance(value, str):
+                found.add(value)
+            else:
+                findValues(value, keys, found)
+    elif isinstance(insts, list):
+        for value in insts:
+            findValues(value, keys, found)
+
+    return found
+
+
+def findCalendars(insts, found=None):
+    return findValues(insts, CALENDAR_KEYS, found)
+
+
+def prepareRequests(requests, loader):
+    requests = [dict(req) for req in requests]
+    calendars = set()
+    for req in requests:
+        if 'insts' not in req:
+            with inst.stage('loader.load', curveId=req['curveId']):
+                req['insts'] = loader.load(req['curveId'])
+        findCalendars(req['insts'], calendars)
+        if req.get('calendar') is not None:
+            calendars.add(req['calendar'])
+
+    return requests, calendars
+
+
+def initCurveWorker(calendars):
+    mgr.preload(calendars, parallel=False)
+
+
+def makeCurveExecutor(workers, calendars):
+    return ProcessPoolExecutor(max_workers=workers,
+                               initializer=initCurveWorker,
+                               initargs=(sorted(calendars),))
+
+
+# upstream curves, if any, come as {name: snapshot}
+def buildCurveSnapshot(req):
+    curves = None
+    if req.get('upstream'):
+        curves = {}
+        for name, data in req['upstream'].items():
+            handle = ql.RelinkableYieldTermStructureHandle()
+            handle.linkTo(snapshot.fromSnapshot(data).getTermStructure())
+            curves[name] = handle
+
+    curve = buildCurve(req['curveEngine'],
+                       req['asOfDate'],
+                       req['basis'],
+                       req['insts'],
+                       req.get('calendar'),
+                       req.get('enableExtrapolation', True),
+                       useCache=False,
+                       curves=curves)
+    return snapshot.toSnapshot(curve)
+
+
+def buildCurves(requests, workers=None, loader=crvLoder.FileCurveReqLoader()):
+    requests, calendars = prepareRequests(requests, loader)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(requests))
+
+    if workers <= 1:
+        results = [buildCurveSnapshot(req) for req in requests]
+    else:
+        with makeCurveExecutor(workers, calendars) as executor:
+            results = list(executor.map(buildCurveSnapshot, requests))
+
+    return [snapshot.fromSnapshot(data) for data in results]
+
+
+class CurveSet(object):
+    """
+    Curves depending on each other, e.g. an OIS discounting curve and the
+    projection curves whose swaps are discounted on it. requests maps curve
+    names to requests; dependencies are the curves named by the
+    discountingCurve/forwardingCurve fields of the instruments plus the
+    optional dependsOn list. Every curve has a relinkable handle which is
+    injected into the helpers of the curves depending on it.
+
+    build() bootstraps level by level; the curves of a level are independent
+    and are built in worker processes when workers > 1 (upstream curves are
+    then passed as snapshots). update() rebuilds a curve and its downstream
+    curves only.
+    """
+
+    def __init__(self, requests, workers=1, loader=crvLoder.FileCurveReqLoader()):
+        names = list(requests.keys())
+        reqs, self.calendars = prepareRequests(
+            [requests[name] for name in names], loader)
+        self.requests = dict(zip(names, reqs))
+        self.workers = workers
+        self.handles = {name: ql.RelinkableYieldTermStructureHandle()
+                        for name in names}
+        self.curves = {}
+        self.dependencies = {}
+        for name, req in self.requests.items():
+            self.dependencies[name] = self.findDependencies(req)
+        self.levels()  # fails early on cycles
+
+    def findDependencies(self, req):
+        deps = findValues(req['insts'], CURVE_REF_KEYS,
+                          set(req.get('dependsOn', [])))
+        for dep in deps:
+            if dep not in self.requests:
+                raise RuntimeError("Curve %s was not found!" % dep)
+
+        return deps
+
+    # names and every curve depending on them, directly or not
+    def downstream(self, names):
+        found = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, deps in self.dependencies.items():
+                if name not in found and deps & found:
+                    found.add(name)
+                    changed = True
+
+        return found
+
+    # names grouped into levels; a curve only depends on earlier levels
+    def levels(self, names=None, dependencies=None):
+        if dependencies is None:
+            dependencies = self.dependencies
+        pending = set(self.requests.keys() if names is None else names)
+        levels = []
+        while pending:
+            level = sorted(name for name in pending
+                           if not dependencies[name] & pending)
+            if len(level) == 0:
+                raise RuntimeError(
+                    "Circular curve dependencies: %s" % ', '.join(sorted(pending)))
+            levels.append(level)
+            pending -= set(level)
+
+        return levels
+
+    def build(self, names=None):
+        levels = self.levels(names)
+        if self.workers <= 1 or max(len(level) for level in levels) <= 1:
+            for level in levels:
+                for name in level:
+                    req = self.requests[name]
+                    self.setCurve(name, buildCurve(req['curveEngine'],
+                                                   req['asOfDate'],
+                                                   req['basis'],
+                                                   req['insts'],
+                                                   req.get('calendar'),
+                                                   req.get('enableExtrapolation', True),
+                                                   useCache=False,
+                                                   curves=self.handles))
+        else:
+            with makeCurveExecutor(self.workers, self.calendars) as executor:
+                for level in levels:
+                    reqs = []
+                    for name in level:
+                        req = dict(self.requests[name])
+                        req['upstream'] = {dep: snapshot.toSnapshot(self.curves[dep])
+                                           for dep in self.dependencies[name]}
+                        reqs.append(req)
+                    for name, data in zip(level, executor.map(buildCurveSnapshot, reqs)):
+                        self.setCurve(name, snapshot.fromSnapshot(data))
+
+        return self.curves
+
+    def setCurve(self, name, curve):
+        self.curves[name] = curve
+        self.handles[name].linkTo(curve.getTermStructure())
+
+    # new instruments for some curves; rebuilds them and what depends on them
+    # the set is only changed once all the new requests are validated
+    def update(self, insts):
+        requests = dict(self.requests)
+        dependencies = dict(self.dependencies)
+        for name, value in insts.items():
+            if name not in self.requests:
+                raise RuntimeError("Curve %s was not found!" % name)
+            req = dict(self.requests[name])
+            req['insts'] = value
+            requests[name] = req
+            dependencies[name] = self.findDependencies(req)
+        self.levels(dependencies=dependencies)  # fails early on cycles
+
+        self.requests = requests
+        self.dependencies = dependencies
+        for value in insts.values():
+            findCalendars(value, self.calendars)
+
+        names = self.downstream(insts.keys())
+        self.build(names)
+        return names
+
+    def getCurve(self, name):
+        return self.curves[name]
+
+    def getHandle(self, name):
+        return self.handles[name]
@@ -0,0 +1,191 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+"""
+Binary snapshots of bootstrapped curves.
+
+Layout (little endian):
+    8 bytes   magic 'QLXCRV01'
+    uint32    length of the JSON meta data
+    uint32    number of nodes n
+    meta      utf-8 JSON: engine, interpolation, basis, calendar,
+              referenceDate, extrapolation; padded to 8 bytes
+    int32[n]  node serials, padded to 8 bytes
+    float64[n] node values
+
+The node values of a piecewise curve are reloaded into the interpolated curve
+of the same interpolation, which reproduces it exactly. Curves with turn of
+year jumps or without a matching interpolated curve are stored as daily
+discount factors instead, which is exact on every date up to the last node.
+"""
+
+import os
+import glob
+import json
+import struct
+import tempfile
+import numpy as np
+import QuantLib as ql
+from . import QuantLibUtils as qlu
+from . import QuantLibClassExt as qlx
+from . import CalendarManager as mgr
+
+MAGIC = b'QLXCRV01'
+HEADER = struct.Struct('<II')
+FILE_EXT = '.crv'
+
+# piecewise engine -> interpolation of its nodes
+ENGINE_INTERPOLATIONS = {
+    'PiecewiseLogLinearDiscount': 'LogLinearDiscount',
+    'PiecewiseLogCubicDiscount': 'MonotonicLogCubicDiscount',
+    'PiecewiseLinearZero': 'LinearZero',
+    'PiecewiseCubicZero': 'CubicZero',
+    'PiecewiseFlatForward': 'BackwardFlatForward',
+}
+
+# interpolation -> curve class taking (dates, values, dayCounter[, calendar])
+CURVE_CLASSES = {
+    'LogLinearDiscount': qlx.XDiscountCurve,
+    'MonotonicLogCubicDiscount': ql.MonotonicLogCubicDiscountCurve,
+    'LinearZero': qlx.XZeroCurve,
+    'CubicZero': ql.CubicZeroCurve,
+    'BackwardFlatForward': ql.ForwardCurve,
+    'DailyDiscount': qlx.XDiscountCurve,
+}
+
+
+def padding(size):
+    return b'\0' * (-size % 8)
+
+
+def getNodes(curve):
+    interpolation = ENGINE_INTERPOLATIONS.get(getattr(curve, 'curveEngine', None))
+    if interpolation is not None and not curve.hasJumps:
+        nodes = curve.nodes()
+        serials = [dt.serialNumber() for dt, _ in nodes]
+        values = [value for _, value in nodes]
+        return interpolation, serials, values
+
+    if not isinstance(curve, qlx.TermStructDecorator):
+        curve = qlx.TermStructDecorator(curve)
+    start = curve.referenceDate().serialNumber()
+    serials = np.arange(start, curve.maxDate().serialNumber() + 1)
+    return 'DailyDiscount', serials, curve.discounts(serials)
+
+
+# the DAY_COUNT_MAP key of the curve's basis, which fromSnapshot resolves
+def getBasisKey(curve):
+    basis = getattr(curve, 'basis', None)
+    if isinstance(basis, str):
+        return basis
+
+    name = curve.dayCounter().name()
+    for key in qlu.getMap('DAY_COUNT_MAP'):
+        try:
+            if qlu.getDayCountBasis(key).name() == name:
+                return key
+        except Exception:  # entries needing a convention can't match
+            continue
+
+    raise RuntimeError("Day counter %s cannot be stored in a snapshot" % name)
+
+
+def toSnapshot(curve):
+    interpolation, serials, values = getNodes(curve)
+    basis = getBasisKey(curve)
+    meta = json.dumps({
+        'engine': getattr(curve, 'curveEngine', None),
+        'interpolation': interpolation,
+        'basis': basis,
+        'calendar': getattr(curve, 'calendarName', None),
+        'referenceDate': curve.referenceDate().serialNumber(),
+        'extrapolation': curve.allowsExtrapolation()
+    }).encode('utf-8')
+    serials = np.asarray(serials, dtype='<i4').tobytes()
+    values = np.asarray(values, dtype='<f8').tobytes()
+
+    return b''.join([MAGIC,
+                     HEADER.pack(len(meta), len(values) // 8),
+                     meta, padding(len(MAGIC) + HEADER.size + len(meta)),
+                     serials, padding(len(serials)),
+                     values])
+
+
+def fromSnapshot(buffer):
+    buffer = memoryview(buffer)
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise RuntimeError("Not a curve snapshot")
+
+    metaLen, n = HEADER.unpack_from(buffer, len(MAGIC))
+    offset = len(MAGIC) + HEADER.size
+    meta = json.loads(bytes(buffer[offset:offset + metaLen]).decode('utf-8'))
+    offset += metaLen + len(padding(offset + metaLen))
+    serials = np.frombuffer(buffer, dtype='<i4', count=n, offset=offset)
+    offset += 4 * n + len(padding(4 * n))
+    values = np.frombuffer(buffer, dtype='<f8', count=n, offset=offset)
+
+    clazz = CURVE_CLASSES.get(meta['interpolation'])
+    if clazz is None:
+        raise RuntimeError("Unknown curve interpolation %s" % meta['interpolation'])
+
+    dates = [ql.Date(serial) for serial in serials.tolist()]
+    args = [dates, values.tolist()]
+    if clazz in (qlx.XDiscountCurve, qlx.XZeroCurve):
+        args.append(meta['basis'])
+        if meta['calendar'] is not None:
+            args.append(meta['calendar'])
+    else:
+        args.append(qlu.getDayCountBasis(meta['basis']))
+        if meta['calendar'] is not None:
+            args.append(mgr.getCalendar(meta['calendar']))
+
+    curve = clazz(*args)
+    if meta['extrapolation']:
+        curve.enableExtrapolation()
+
+    return qlx.TermStructDecorator(curve, meta['engine'], meta['basis'],
+                                   meta['calendar'])
+
+
+def saveSnapshot(curve, path):
+    dirName = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dirName, exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=dirName, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(toSnapshot(curve))
+        os.chmod(tmpPath, 0o644)
+        os.replace(tmpPath, path)
+    except BaseException:
+        os.remove(tmpPath)
+        raise
+
+
+def loadSnapshot(path):
+    return fromSnapshot(np.memmap(path, dtype=np.uint8, mode='r'))
+
+
+# a curve set is a directory of <name>.crv files
+def saveSnapshots(curves, dirPath):
+    for name, curve in curves.items():
+        saveSnapshot(curve, os.path.join(dirPath, name + FILE_EXT))
+
+
+def loadSnapshots(dirPath):
+    curves = {}
+    for path in sorted(glob.glob(os.path.join(dirPath, '*' + FILE_EXT))):
+        name = os.path.basename(path)[:-len(FILE_EXT)]
+        curves[name] = loadSnapshot(path)
+
+    return curves
@@ -1,10 +1,18 @@
+import numpy as np
 import QuantLib as ql
 from . import QuantLibUtils as qlu
 from . import DatetimeUtils as dfs
 from . import CalendarManager as mgr
+from . import QuantLibClassExt as qlx
 
+# day counters whose year fraction only depends on the number of days
+ACTUAL_DAY_COUNT_DENOMINATORS = {
+    'Actual/360': 360.0,
+    'Actual/365 (Fixed)': 365.0
+}
 
-def oneDayForwardRates(curve, period, calendar, startDate=None, dayCount=None, compounding=ql.Compounded, freq=ql.Annual):
+
+def oneDayForwardRates(curve, period, calendar, startDate=None, dayCount=None, compounding=ql.Compounded, freq=ql.Annual, asArrays=False):
     startDate = startDate if startDate is not None else curve.referenceDate()
     startDate = startDate if isinstance(
         startDate, ql.Date) else dfs.toQLDate(startDate)
@@ -16,9 +24,6 @@ def oneDayForwardRates(curve, period, calendar, startDate=None, dayCount=None, c
     else:
         dayCount = dayCount if isinstance(
             dayCount, ql.DayCounter) else qlu.getDayCountBasis(dayCount)
-    dates = [ql.Date(serial)
-             for serial
-             in range(startDate.serialNumber(), endDate.serialNumber() + 1)]
 
     if calendar is None:
         raise RuntimeError('You must provide a calendar')
@@ -29,8 +34,92 @@ def oneDayForwardRates(curve, period, calendar, startDate=None, dayCount=None, c
         calendar = calendar if isinstance(
             calendar, ql.Calendar) else mgr.getCalendar(calendar)
 
+    if asArrays:
+        return oneDayForwardRateArrays(curve, startDate, endDate, calendar, dayCount,
+                                       qlu.getCompoundType(compounding), qlu.getFrequency(freq))
+
+    dates = [ql.Date(serial)
+             for serial
+             in range(startDate.serialNumber(), endDate.serialNumber() + 1)]
+
     rates = [curve.forwardRate(d,
                                calendar.advance(d, 1, ql.Days), dayCount, compounding, freq).rate()
              for d in dates]
 
     return {'dates': dates, 'rates': rates}
+
+
+# Same as oneDayForwardRates but returns Excel serials and rates as NumPy
+# arrays. The next business days are taken from a single holiday list and
+# the forwards are implied from one batched discount factor sampling.
+def oneDayForwardRateArrays(curve, startDate, endDate, calendar, dayCount, compounding, freq):
+    start = startDate.serialNumber()
+    serials = np.arange(start, endDate.serialNumber() + 1, dtype=np.int64)
+    nextDays = nextBusinessDays(calendar, serials)
+
+    if not isinstance(curve, qlx.TermStructDecorator):
+        curve = qlx.TermStructDecorator(curve)
+    discounts = curve.discounts(np.arange(start, nextDays[-1] + 1))
+    compound = discounts[serials - start] / discounts[nextDays - start]
+    times = yearFractions(dayCount, serials, nextDays)
+    rates = impliedRates(compound, times, compounding, freq)
+
+    return {'dates': serials, 'rates': rates}
+
+
+# first business day strictly after each of the (sorted) serials,
+# i.e. calendar.advance(d, 1, ql.Days) for the whole range at once
+def nextBusinessDays(calendar, serials):
+    first = int(serials[0])
+    last = int(serials[-1])
+    pad = 16
+    while True:
+        end = min(last + pad, 109574)
+        holidays = calendar.holidayList(ql.Date(first), ql.Date(end), True)
+        isBusinessDay = np.ones(end - first + 1, dtype=bool)
+        isBusinessDay[[d.serialNumber() - first for d in holidays]] = False
+        businessDays = np.flatnonzero(isBusinessDay)
+        pos = np.searchsorted(businessDays, serials - first, side='right')
+        if pos[-1] < len(businessDays):
+            return businessDays[pos] + first
+        if end == 109574:
+            raise RuntimeError('No business day found after %d' % last)
+        pad *= 2
+
+
+# only Actual/360 and Actual/365 (Fixed) are computed as arrays; every
+# other day counter, 30/360 and Act/Act included, is called date by date
+def yearFractions(dayCount, d1s, d2s):
+    denominator = ACTUAL_DAY_COUNT_DENOMINATORS.get(dayCount.name())
+    if denominator is not None:
+        return (d2s - d1s) / denominator
+
+    return np.fromiter((dayCount.yearFraction(ql.Date(d1), ql.Date(d2))
+                        for d1, d2 in zip(d1s.tolist(), d2s.tolist())),
+                       dtype=np.float64, count=len(d1s))
+
+
+# vectorized InterestRate.impliedRate from compound factors and times;
+# like QuantLib, zero times (e.g. 30/360 from the 30th to the 31st) raise
+def impliedRates(compound, times, compounding, freq):
+    times = np.asarray(times, dtype=np.float64)
+    if np.any(times <= 0.0):
+        raise RuntimeError('positive time (%g) required' % times[times <= 0.0][0])
+
+    f = float(freq)
+    if compounding == ql.Simple:
+        return (compound - 1.0) / times
+    elif compounding == ql.Continuous:
+        return np.log(compound) / times
+    elif compounding == ql.Compounded:
+        return (np.power(compound, 1.0 / (f * times)) - 1.0) * f
+    elif compounding == ql.SimpleThenCompounded:
+        return np.where(times <= 1.0 / f,
+                        impliedRates(compound, times, ql.Simple, freq),
+                        impliedRates(compound, times, ql.Compounded, freq))
+    elif compounding == ql.CompoundedThenSimple:
+        return np.where(times <= 1.0 / f,
+                        impliedRates(compound, times, ql.Compounded, freq),
+                        impliedRates(compound, times, ql.Simple, freq))
+    else:
+        raise ValueError('Unknown compounding convention: %s' % compounding)
@@ -22,3 +22,7 @@ class DataLoader(object):
     def load(self, calId):
         raise RuntimeError(
             "This is the super class of all data loaders (calendar/schedule/curve, etc), please use any concret one")
+
+    def listIds(self):
+        raise RuntimeError(
+            "%s cannot list the ids it is able to load" % type(self).__name__)
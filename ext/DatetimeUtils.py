@@ -14,8 +14,10 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 import datetime as datetime
+from functools import lru_cache
+import numpy as np
 import QuantLib as ql
-# from . import QuantLibUtils
+from . import TenorParser as tp
 
 TIME_UNIT_MAP = {
     'D': ql.Days,
@@ -37,6 +39,10 @@ TIME_UNIT_MAP = {
 # January 1st, 1901   serial: 367
 # December 31st, 2199 serial: 109574
 
+# Excel serial of 1970-01-01, the datetime64 epoch
+EPOCH_XLSERIAL = 25569
+QLDATE_CACHE_SIZE = 4096
+
 
 def isExcelSerial(dt):
     return dt is not None and isinstance(dt, int) and dt >= 367 and dt <= 109574
@@ -95,15 +101,41 @@ def yyyymmdd2datetime(yyyymmdd):
     return datetime.datetime(yyyy, mm, dd)
 
 
+# Days since 1970-01-01 of a civil date and back, with integer arithmetic
+# only (H. Hinnant's days_from_civil/civil_from_days). Both work on ints as
+# well as on numpy int64 arrays, element-wise.
+def daysFromCivil(y, m, d):
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * ((m + 9) % 12) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def civilFromDays(days):
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = mp + 3 - 12 * (mp >= 10)
+    y = yoe + era * 400 + (m <= 2)
+    return y, m, d
+
+
 def xlserial2yyyymmdd(serial):
-    dt = xlserial2datetime(serial)
-    yyyymmdd = dt.year * 10000 + dt.month * 100 + dt.day
-    return yyyymmdd
+    y, m, d = civilFromDays(int(serial) - EPOCH_XLSERIAL)
+    return y * 10000 + m * 100 + d
 
 
 def yyyymmdd2xlserial(yyyymmdd):
-    dt = yyyymmdd2datetime(yyyymmdd)
-    return datetime2xlserial(dt)
+    yyyymmdd = int(yyyymmdd)
+    days = daysFromCivil(yyyymmdd // 10000, (yyyymmdd // 100) % 100,
+                         yyyymmdd % 100)
+    return float(days + EPOCH_XLSERIAL)
 
 
 def number2yyyymmdd(nbr):
@@ -129,6 +161,65 @@ def number2xlserial(nbr):
     return nbr
 
 
+# Array conversions between yyyymmdd ints, Excel serials and datetime64[D].
+# They take anything np.asarray accepts and return int64 (or datetime64[D])
+# arrays without creating a Python object per element.
+
+
+def yyyymmdds2xlserials(ymds):
+    ymds = np.asarray(ymds).astype(np.int64)
+    dd = ymds % 100
+    mm = (ymds // 100) % 100
+    if np.any((dd < 1) | (dd > 31) | (mm < 1) | (mm > 12)):
+        raise ValueError('Invalid yyyymmdd.')
+
+    return daysFromCivil(ymds // 10000, mm, dd) + EPOCH_XLSERIAL
+
+
+def xlserials2yyyymmdds(serials):
+    serials = np.asarray(serials).astype(np.int64)
+    y, m, d = civilFromDays(serials - EPOCH_XLSERIAL)
+    return y * 10000 + m * 100 + d
+
+
+def xlserials2datetime64s(serials):
+    serials = np.asarray(serials).astype(np.int64)
+    return (serials - EPOCH_XLSERIAL).astype('datetime64[D]')
+
+
+def datetime64s2xlserials(dts):
+    days = np.asarray(dts).astype('datetime64[D]').astype(np.int64)
+    return days + EPOCH_XLSERIAL
+
+
+def yyyymmdds2datetime64s(ymds):
+    return xlserials2datetime64s(yyyymmdds2xlserials(ymds))
+
+
+def datetime64s2yyyymmdds(dts):
+    return xlserials2yyyymmdds(datetime64s2xlserials(dts))
+
+
+# vectorized number2xlserial: accepts yyyymmdd and Excel serials (mixed)
+# and returns an int64 array of Excel serials
+def numbers2xlserials(nbrs):
+    nbrs = np.asarray(nbrs).astype(np.int64)
+    isYMD = nbrs > 19000101
+    serials = nbrs.copy()
+    serials[isYMD] = yyyymmdds2xlserials(nbrs[isYMD])
+    return serials
+
+
+# vectorized number2yyyymmdd
+def numbers2yyyymmdds(nbrs):
+    nbrs = np.asarray(nbrs).astype(np.int64)
+    isSerial = nbrs <= 19000101
+    ymds = nbrs.copy()
+    ymds[isSerial] = xlserials2yyyymmdds(nbrs[isSerial])
+    ymds[~isSerial] = xlserials2yyyymmdds(yyyymmdds2xlserials(nbrs[~isSerial]))
+    return ymds
+
+
 def number2datetime(nbr):
     xlserial = number2xlserial(nbr)
     return xlserial2datetime(xlserial)
@@ -155,9 +246,17 @@ def number2qldate(nbr):
     return ql.Date(d, m, y)
 
 
+# ql.Date instances are immutable, so repeated dates can share one
+@lru_cache(maxsize=QLDATE_CACHE_SIZE)
+def cachedQLDate(nbr):
+    return number2qldate(nbr)
+
+
 def toQLDate(dt):
     if isinstance(dt, ql.Date):
         return dt
+    elif isinstance(dt, (int, np.integer)):
+        return cachedQLDate(int(dt))
     else:
         return number2qldate(dt)
 
@@ -249,49 +348,9 @@ def tenor2period(tenor):
     tenor = tenor.upper()
     p = None
     if tenor.endswith('D') or tenor.endswith('W') or tenor.endswith('M') or tenor.endswith('Y'):
-        amt = int(tenor[:len(tenor) - 1])
-        unit = tenor[-1:]
-        # print("%s %s" % (amt, unit))
-        p = ql.Period(amt, getTimeUnit(unit))
-        # print(p)
+        p = tp.parseTenor(tenor)
     return p
 
 
 def parseTenor(tenor):
-    tenor = tenor.upper().strip()
-    if tenor == 'NONE':
-        return None
-
-    pos = 0
-    years = 0
-    months = 0
-    weeks = 0
-    days = 0
-    for i, c in enumerate(tenor):
-        if c in "YMWD":
-            nbr = int(tenor[pos:i])
-            pos = i + 1
-            if c == 'Y':
-                years = nbr
-            elif c == 'M':
-                months = nbr
-            elif c == 'W':
-                weeks = nbr
-            else:
-                days = nbr
-
-    if years > 0 and months:  # convert to months
-        months += years * 12
-        years = 0
-
-    p = None
-    if years > 0:
-        p = ql.Period(years, ql.Years)
-    elif months > 0:
-        p = ql.Period(months, ql.Months)
-    elif weeks > 0:
-        p = ql.Period(weeks, ql.Weeks)
-    else:
-        p = ql.Period(days, ql.Days)
-
-    return p
+    return tp.parseTenor(tenor)
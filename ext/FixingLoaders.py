@@ -0,0 +1,130 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+# Loaders of historical index fixings. Indices are named as for
+# QuantLibUtils.getMarketIndex, e.g. 'Euribor,6M' or 'Eonia'; a fixing is a
+# (yyyymmdd, value) pair.
+
+import threading
+
+from . import Utils as utils
+from . import DatetimeUtils as dfs
+from . import QuantLibUtils as qlu
+from .DataLoader import DataLoader
+from .SQLiteLoader import SQLiteLoader, MAX_PARAMS
+
+
+class CSVFixingLoader(DataLoader):
+    # CSV file with a header and the columns index, date, value; quote
+    # index names with a tenor: "Euribor,6M",20190102,-0.00237
+    def __init__(self, path, *args, **kargs):
+        super().__init__(*args, **kargs)
+        self.path = path
+        self.fixings = None
+        self.lock = threading.Lock()
+
+    def parse(self):
+        with self.lock:
+            if self.fixings is None:
+                fixings = {}
+                rows = utils.loadCSVFromFile(self.path)
+                next(rows, None)  # header
+                for row in rows:
+                    if len(row) < 3:
+                        continue
+                    fixings.setdefault(row[0].strip(), []).append(
+                        (int(row[1]), float(row[2])))
+                for values in fixings.values():
+                    values.sort()
+                self.fixings = fixings
+
+        return self.fixings
+
+    def load(self, indexName):
+        return self.parse().get(indexName, [])
+
+    def loadMany(self, indexNames):
+        fixings = self.parse()
+        return {name: fixings.get(name, []) for name in indexNames}
+
+    def listIds(self):
+        return list(self.parse().keys())
+
+
+class SQLiteFixingLoader(SQLiteLoader):
+    # reads the fixings table of quantlib.db, which createTables() adds:
+    #   fixings (indexName text, date integer, value real,
+    #            UNIQUE (indexName, date))
+    # dates are yyyymmdd, index names as for CSVFixingLoader
+    def createTables(self):
+        self.executeScript(
+            """CREATE TABLE IF NOT EXISTS fixings (
+                   indexName text, date integer, value real,
+                   UNIQUE (indexName, date))""")
+
+    # creates the indexName index when the table was created without the
+    # UNIQUE (indexName, date) constraint, which already provides one
+    def createIndexes(self):
+        self.executeScript(
+            'CREATE INDEX IF NOT EXISTS idx_fixings_indexName ON fixings (indexName)')
+
+    def load(self, indexName):
+        return self.loadMany([indexName])[indexName]
+
+    def loadMany(self, indexNames):
+        indexNames = list(indexNames)
+        fixings = {name: [] for name in indexNames}
+        requested = utils.requestedCodes(indexNames)
+        with self.lock:
+            c = self.getConnection().cursor()
+            for i in range(0, len(indexNames), MAX_PARAMS):
+                params = tuple(indexNames[i:i + MAX_PARAMS])
+                recs = c.execute(
+                    """SELECT indexName, date, value
+                       FROM fixings
+                       WHERE indexName IN (%s)
+                       ORDER BY indexName, date""" % ','.join('?' * len(params)), params)
+                for indexName, date, value in recs:
+                    for name in requested.get(indexName.upper(), []):
+                        fixings[name].append((int(date), float(value)))
+            c.close()
+
+        return fixings
+
+    def listIds(self):
+        with self.lock:
+            c = self.getConnection().cursor()
+            recs = c.execute('SELECT DISTINCT indexName FROM fixings')
+            indexNames = [row[0] for row in recs]
+            c.close()
+
+        return indexNames
+
+
+# adds the fixings of the given indices (all the loader has by default) to
+# the shared index instances; returns the number of fixings per index
+def loadFixings(loader, indexNames=None, forceOverwrite=True):
+    if indexNames is None:
+        indexNames = loader.listIds()
+
+    counts = {}
+    for indexName, fixings in loader.loadMany(indexNames).items():
+        if len(fixings) > 0:
+            index = qlu.getMarketIndex(indexName)
+            index.addFixings([dfs.toQLDate(date) for date, _ in fixings],
+                             [value for _, value in fixings],
+                             forceOverwrite)
+        counts[indexName] = len(fixings)
+
+    return counts
@@ -0,0 +1,138 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+"""
+Opt-in timing and counters for curve builds.
+
+Nothing is recorded unless enabled, by enable() or the INSTRUMENTATION
+environment variable. A stage records its wall time, counters and nested
+stages:
+    {'stage': 'buildCurve', 'tags': {...}, 'seconds': 0.12,
+     'counters': {'helpers.Swaps': 5}, 'children': [...], 'error': None}
+Top level stages are kept in a bounded history and passed to the callbacks,
+e.g. to push them into a metrics system. Counters are also summed over all
+stages in totals.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from . import Config as config
+
+HISTORY_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+enabled = config.isInstrumentationEnabled()
+history = deque(maxlen=HISTORY_SIZE)
+totals = {}
+callbacks = []
+lock = threading.Lock()
+local = threading.local()
+
+
+def enable(flag=True):
+    global enabled
+    config.enableInstrumentation(flag)
+    enabled = flag
+
+
+def isEnabled():
+    return enabled
+
+
+def addCallback(func):
+    with lock:
+        callbacks.append(func)
+
+
+def removeCallback(func):
+    with lock:
+        callbacks.remove(func)
+
+
+def currentStage():
+    return getattr(local, 'current', None)
+
+
+@contextmanager
+def stage(name, **tags):
+    if not enabled:
+        yield None
+        return
+
+    rec = {
+        'stage': name,
+        'tags': tags,
+        'seconds': None,
+        'counters': {},
+        'children': [],
+        'error': None
+    }
+    parent = currentStage()
+    local.current = rec
+    start = time.perf_counter()
+    try:
+        yield rec
+    except Exception as e:
+        rec['error'] = str(e)
+        raise
+    finally:
+        rec['seconds'] = time.perf_counter() - start
+        local.current = parent
+        if parent is not None:
+            parent['children'].append(rec)
+        else:
+            with lock:
+                history.append(rec)
+                funcs = list(callbacks)
+            # a failing callback must neither break nor mask the build
+            for func in funcs:
+                try:
+                    func(rec)
+                except Exception:
+                    logger.exception('Instrumentation callback %r failed', func)
+
+
+def count(name, n=1):
+    if not enabled:
+        return
+
+    rec = currentStage()
+    if rec is not None:
+        rec['counters'][name] = rec['counters'].get(name, 0) + n
+    with lock:
+        totals[name] = totals.get(name, 0) + n
+
+
+def setError(error):
+    rec = currentStage()
+    if enabled and rec is not None:
+        rec['error'] = str(error)
+
+
+def report():
+    with lock:
+        return {
+            'stages': list(history),
+            'totals': dict(totals)
+        }
+
+
+def reset():
+    with lock:
+        history.clear()
+        totals.clear()
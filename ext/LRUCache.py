@@ -0,0 +1,148 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Thread-safe cache with optional bounds on the number of entries,
+    on the estimated size in bytes (sizeOf(value)) and on the age of the
+    entries (ttl in seconds). Least recently used entries are evicted
+    first. Without any bound it behaves like a plain dict and reads do
+    not take the lock.
+    """
+
+    def __init__(self, maxEntries=None, maxBytes=None, ttl=None, sizeOf=None):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.ttl = ttl
+        self.sizeOf = sizeOf if sizeOf is not None else (lambda value: 0)
+        self.isBounded = maxEntries is not None or maxBytes is not None
+        self.lock = threading.Lock()
+        # key -> (value, size, expiry time)
+        self.data = OrderedDict()
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # re-bounds the cache in place, keeping the entries (within the new
+    # bounds) and the stats; a new ttl applies to entries put from now on
+    def setPolicy(self, maxEntries=None, maxBytes=None, ttl=None):
+        with self.lock:
+            self.maxEntries = maxEntries
+            self.maxBytes = maxBytes
+            self.ttl = ttl
+            self.isBounded = maxEntries is not None or maxBytes is not None
+            self.evict(None)
+
+    def isExpired(self, entry):
+        return entry[2] is not None and entry[2] <= time.monotonic()
+
+    def get(self, key, default=None):
+        entry = self.data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        if self.isExpired(entry):
+            with self.lock:
+                if self.data.get(key) is entry:
+                    self.remove(key)
+                    self.expirations += 1
+                self.misses += 1
+            return default
+
+        if self.isBounded:
+            with self.lock:
+                if key in self.data:
+                    self.data.move_to_end(key)
+                self.hits += 1
+        else:
+            self.hits += 1
+
+        return entry[0]
+
+    # like get, without touching the LRU order and the hit/miss counters
+    def peek(self, key, default=None):
+        entry = self.data.get(key)
+        if entry is None or self.isExpired(entry):
+            return default
+
+        return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeOf(value)
+        expiry = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            if key in self.data:
+                self.remove(key)
+            self.data[key] = (value, size, expiry)
+            self.totalBytes += size
+            self.evict(key)
+
+    def evict(self, newKey):
+        # drop expired entries at the old end, then least recently used
+        # ones until within bounds (the entry just added is always kept)
+        while self.data:
+            key, entry = next(iter(self.data.items()))
+            if key == newKey or not self.isExpired(entry):
+                break
+            self.remove(key)
+            self.expirations += 1
+
+        while len(self.data) > 1 and (
+                (self.maxEntries is not None and len(self.data) > self.maxEntries) or
+                (self.maxBytes is not None and self.totalBytes > self.maxBytes)):
+            self.remove(next(iter(self.data)))
+            self.evictions += 1
+
+    def remove(self, key):
+        entry = self.data.pop(key)
+        self.totalBytes -= entry[1]
+        return entry
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            return self.remove(key)[0]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.totalBytes = 0
+
+    def keys(self):
+        return list(self.data.keys())
+
+    def stats(self):
+        return {
+            'entries': len(self.data),
+            'bytes': self.totalBytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def __contains__(self, key):
+        entry = self.data.get(key)
+        return entry is not None and not self.isExpired(entry)
+
+    def __len__(self):
+        return len(self.data)
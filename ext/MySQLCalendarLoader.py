@@ -14,16 +14,44 @@
 
 
 import os
-import mysql.connector
+try:
+    import mysql.connector
+except ImportError:  # only needed to connect to a real MySQL server
+    mysql = None
 # import sqlite3
 
 from . import Config as config
+from . import ConnectionPool as cp
+from . import Utils as utils
 from .DataLoader import DataLoader
 
+# number of codes per IN (...) query
+BATCH_SIZE = 500
+
+
+def makeConnection():
+    conn = mysql.connector.connect(
+        host=os.getenv('DB_HOST', "127.0.0.1"),
+        port=os.getenv('DB_PORT', 3306),
+        user=os.getenv('DB_UID', 'your login id'),
+        password=os.getenv('DB_PWD', "your password"),
+        database=os.getenv('DB_NAME', 'quantlib'))
+
+    return conn
+
+
+# the connection pool shared by the MySQL calendar and schedule loaders
+def getSharedPool():
+    return cp.getPool('mysql', makeConnection,
+                      config.getDBPoolSize(), config.getDBPoolIdleTimeout())
+
 
 class MySQLCalendarLoader(DataLoader):
-    def __init__(self, *args, **kargs):
+    # pool and placeholder can be replaced, e.g. by a SQLite pool and '?'
+    def __init__(self, *args, pool=None, placeholder='%s', **kargs):
         super().__init__(*args, **kargs)
+        self.pool = pool if pool is not None else getSharedPool()
+        self.placeholder = placeholder
 
     def getDBDir(self):
         dbDir = os.getenv('DB_DIR', None)
@@ -33,21 +61,30 @@ class MySQLCalendarLoader(DataLoader):
         return dbDir
 
     def makeConnection(self):
-        conn = mysql.connector.connect(
-            host=os.getenv('DB_HOST', "127.0.0.1"),
-            port=os.getenv('DB_PORT', 3306),
-            user=os.getenv('DB_UID', 'your login id'),
-            password=os.getenv('DB_PWD', "your password"),
-            database=os.getenv('DB_NAME', 'quantlib'))
-
-        return conn
+        return makeConnection()
 
     def load(self, calName):
-        conn = self.makeConnection()
-        params = (calName,)
-        c = conn.cursor()
-        recs = c.execute('SELECT date FROM calendars WHERE calCode=%s', params)
-        dates = [int(d[0]) for d in recs]
-        conn.close()
-
-        return dates
+        return self.loadMany([calName])[calName]
+
+    # holidays of several calendars, one query per BATCH_SIZE codes;
+    # codes are matched case-insensitively
+    def loadMany(self, calNames):
+        calNames = list(calNames)
+        holidays = {calName: [] for calName in calNames}
+        requested = utils.requestedCodes(calNames)
+        codes = list(requested.keys())
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            for i in range(0, len(codes), BATCH_SIZE):
+                params = tuple(codes[i:i + BATCH_SIZE])
+                c.execute(
+                    """SELECT calCode, date
+                       FROM calendars
+                       WHERE calCode IN (%s)
+                       ORDER BY calCode, date""" % ','.join([self.placeholder] * len(params)), params)
+                for calCode, date in c.fetchall():
+                    for calName in requested.get(calCode.upper(), []):
+                        holidays[calName].append(int(date))
+            c.close()
+
+        return holidays
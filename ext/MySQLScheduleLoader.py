@@ -14,16 +14,19 @@
 
 
 import os
-import mysql.connector
 # import json
 
 from . import Config as config
 from .DataLoader import DataLoader
+from .MySQLCalendarLoader import getSharedPool, makeConnection, BATCH_SIZE
 
 
 class MySQLScheduleLoader(DataLoader):
-    def __init__(self, *args, **kargs):
+    # pool and placeholder can be replaced, e.g. by a SQLite pool and '?'
+    def __init__(self, *args, pool=None, placeholder='%s', **kargs):
         super().__init__(*args, **kargs)
+        self.pool = pool if pool is not None else getSharedPool()
+        self.placeholder = placeholder
 
     def getDBDir(self):
         dbDir = os.getenv('DB_DIR', None)
@@ -33,41 +36,54 @@ class MySQLScheduleLoader(DataLoader):
         return dbDir
 
     def makeConnection(self):
-        conn = mysql.connector.connect(
-            host=os.getenv('DB_HOST', "127.0.0.1"),
-            port=os.getenv('DB_PORT', 3306),
-            user=os.getenv('DB_UID', 'your login id'),
-            password=os.getenv('DB_PWD', "your password"),
-            database=os.getenv('DB_NAME', 'quantlib'))
-
-        return conn
+        return makeConnection()
 
     def load(self, prodCode):
-        conn = self.makeConnection()
-        params = (prodCode,)
-        c = conn.cursor()
-        # https://docs.python.org/3/library/sqlite3.html
-        c.execute(
-            """SELECT rolling, calendar
-               FROM schedules
-               WHERE prodCode=%s""", params)
-        rec = c.fetchone()
-        if rec is None:
+        schedules = self.loadMany([prodCode])
+        if prodCode not in schedules:
             raise RuntimeError("schedue for %s was not found" % prodCode)
-        c.execute(
-            """SELECT date
-               FROM schedule_dates
-               WHERE prodCode=%s""", params)
-        rows = c.fetchall()
 
-        # schedule = json.loads(rec[0])
-        # conn.close()
+        return schedules[prodCode]
+
+    # schedules of several products, two queries per BATCH_SIZE codes.
+    # Products without a schedule are left out of the result.
+    def loadMany(self, prodCodes):
+        prodCodes = list(prodCodes)
+        schedules = {}
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            for i in range(0, len(prodCodes), BATCH_SIZE):
+                params = tuple(prodCodes[i:i + BATCH_SIZE])
+                marks = ','.join([self.placeholder] * len(params))
+                c.execute(
+                    """SELECT prodCode, rolling, calendar
+                       FROM schedules
+                       WHERE prodCode IN (%s)""" % marks, params)
+                for prodCode, rolling, calendar in c.fetchall():
+                    schedules[prodCode] = {
+                        'prodCode': prodCode,
+                        'rolling': rolling,
+                        'calendar': calendar,
+                        'dates': []
+                    }
+
+                c.execute(
+                    """SELECT prodCode, date
+                       FROM schedule_dates
+                       WHERE prodCode IN (%s)
+                       ORDER BY prodCode, date""" % marks, params)
+                for prodCode, date in c.fetchall():
+                    if prodCode in schedules:
+                        schedules[prodCode]['dates'].append(date)
+            c.close()
+
+        return schedules
 
-        schedule = {
-            'prodCode': prodCode,
-            'rolling': rec[0],
-            'calendar': rec[1],
-            'dates': [dt[0] for dt in rows]
-        }
+    def listIds(self):
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT DISTINCT prodCode FROM schedules')
+            prodIds = [row[0] for row in c.fetchall()]
+            c.close()
 
-        return schedule
+        return prodIds
@@ -12,6 +12,7 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
+import numpy as np
 import QuantLib as ql
 from . import QuantLibUtils as qlu
 from . import DatetimeUtils as dfs
@@ -178,6 +179,63 @@ class Schedule(ql.Schedule):
             raise RuntimeError('Invalid input for Schedule')
 
 
+# columns of a cash flow table; serials are QuantLib (= Excel) serials,
+# 0 for the accrual dates of non-coupon flows such as redemptions
+CASH_FLOW_FIELDS = (
+    ('date', np.int32),
+    ('amount', np.float64),
+    ('accrualStart', np.int32),
+    ('accrualEnd', np.int32),
+    ('rate', np.float64),
+    ('nominal', np.float64),
+)
+
+
+# floating coupons without fixings or a forecast curve get NaN amounts
+def cashFlowRecord(cf):
+    try:
+        amount = cf.amount()
+    except RuntimeError:
+        amount = np.nan
+
+    coupon = ql.as_coupon(cf)
+    if coupon is None:
+        return cf.date().serialNumber(), amount, 0, 0, np.nan, np.nan
+
+    try:
+        rate = coupon.rate()
+    except RuntimeError:
+        rate = np.nan
+
+    return (cf.date().serialNumber(),
+            amount,
+            coupon.accrualStartDate().serialNumber(),
+            coupon.accrualEndDate().serialNumber(),
+            rate,
+            coupon.nominal())
+
+
+def makeCashFlowTable(records):
+    columns = list(zip(*records)) if len(records) > 0 else [()] * len(CASH_FLOW_FIELDS)
+    return {name: np.array(column, dtype=dtype)
+            for (name, dtype), column in zip(CASH_FLOW_FIELDS, columns)}
+
+
+# the cash flows of all the bonds in one table; the bond column is the
+# position of the bond in bonds
+def cashFlowTables(bonds):
+    records = []
+    counts = []
+    for bond in bonds:
+        flows = bond.cashflows()
+        records.extend(cashFlowRecord(cf) for cf in flows)
+        counts.append(len(flows))
+
+    table = makeCashFlowTable(records)
+    table['bond'] = np.repeat(np.arange(len(counts)), counts)
+    return table
+
+
 class BondDecorator(object):
     def __init__(self, bond):
         self._bond = bond
@@ -240,6 +298,10 @@ class BondDecorator(object):
 
         return self._bond.bondYield(*tuple(newArgs))
 
+    # cash flows as columnar arrays, see CASH_FLOW_FIELDS
+    def cashFlowTable(self):
+        return makeCashFlowTable([cashFlowRecord(cf) for cf in self._bond.cashflows()])
+
     # =======================================================
     #     Date  settlementDate (Date d=Date())
     # =======================================================
@@ -513,6 +575,61 @@ def FixedRateBond(*args, curve, engine):
     bond.setPricingEngine(bondEngine)
     return BondDecorator(bond)
 
+
+# bond static data of FixedRateBonds, in the order of FixedRateBond's first
+# constructor; the first five are mandatory
+FIXED_RATE_BOND_FIELDS = ('settlementDays', 'faceAmount', 'scheduleId',
+                          'coupons', 'basis', 'paymentConvention',
+                          'redemption', 'issueDate')
+
+
+def FixedRateBonds(rows, curve=None, engine=None):
+    """
+    Decorated fixed rate bonds from a table of static data, rows given as
+    sequences or dicts of FIXED_RATE_BOND_FIELDS. The schedules are fetched
+    in one go and shared among identical ones; day counters, conventions
+    and the pricing engine (if curve and engine are given) are resolved
+    once for all the bonds.
+    """
+    rows = [[row.get(name) for name in FIXED_RATE_BOND_FIELDS]
+            if isinstance(row, dict) else list(row) for row in rows]
+    schedules = scm.getSchedules([row[2] for row in rows])
+    bondEngine = None
+    if engine is not None:
+        bondEngine = qlu.getPricingEngine(engine,
+                                          ql.YieldTermStructureHandle(curve))
+
+    resolved = {}
+
+    def resolve(func, value):
+        key = (func, value)
+        if key not in resolved:
+            resolved[key] = func(value)
+        return resolved[key]
+
+    bonds = []
+    for row, schedule in zip(rows, schedules):
+        coupons = row[3] if isinstance(row[3], (list, tuple)) else [row[3]]
+        args = [row[0], row[1], schedule, coupons,
+                resolve(qlu.getDayCountBasis, row[4])]
+        optional = row[5:]
+        while len(optional) > 0 and optional[-1] is None:
+            optional = optional[:-1]
+        if len(optional) > 0:
+            args.append(ql.Following if optional[0] is None
+                        else resolve(qlu.getRollingConv, optional[0]))
+        if len(optional) > 1:
+            args.append(100.0 if optional[1] is None else optional[1])
+        if len(optional) > 2:
+            args.append(dfs.toQLDate(optional[2]))
+
+        bond = ql.FixedRateBond(*args)
+        if bondEngine is not None:
+            bond.setPricingEngine(bondEngine)
+        bonds.append(BondDecorator(bond))
+
+    return bonds
+
 # =============================================================================
 # VanillaSwap (   Type    type,
 #     Real    nominal,
@@ -737,12 +854,21 @@ class XZeroCurve(ql.ZeroCurve):
 
 
 class TermStructDecorator(object):
-    def __init__(self, term_struct):
+    # curveEngine, basis, calendarName and hasJumps describe how the curve was
+    # built; CurveSnapshot uses them to reload it without re-solving
+    def __init__(self, term_struct, curveEngine=None, basis=None, calendarName=None, hasJumps=False):
         self._term_struct = term_struct
+        self.curveEngine = curveEngine
+        self.basis = basis
+        self.calendarName = calendarName
+        self.hasJumps = hasJumps
 
     def __getattr__(self, name):
         return getattr(self._term_struct, name)
 
+    def getTermStructure(self):
+        return self._term_struct
+
     # =======================================================
     # DiscountFactor discount(const Date&,
     #      bool extrapolate = false);
@@ -844,6 +970,78 @@ class TermStructDecorator(object):
         return self._term_struct.forwardRate(*tuple(newArgs))
 
 
+    # =======================================================
+    # Batch variants of discount/zeroRate/forwardRate.
+    # Inputs are arrays of yyyymmdd, Excel serials or year fractions
+    # (anything below the first valid serial 367 is taken as a time).
+    # Day count, compounding and frequency are resolved once per batch
+    # and the results are returned as float64 NumPy arrays.
+    # =======================================================
+    def discounts(self, values, extrapolate=False):
+        isTime, values = batchInput(values)
+        ts = self._term_struct
+        if isTime:
+            res = (ts.discount(t, extrapolate) for t in values.tolist())
+        else:
+            res = (ts.discount(ql.Date(s), extrapolate)
+                   for s in values.tolist())
+
+        return np.fromiter(res, dtype=np.float64, count=len(values))
+
+    def zeroRates(self, values, dayCount, compounding, frequency=ql.Annual, extrapolate=False):
+        isTime, values = batchInput(values)
+        compounding = qlu.getCompoundType(compounding)
+        frequency = qlu.getFrequency(frequency)
+        ts = self._term_struct
+        if isTime:
+            res = (ts.zeroRate(t, compounding, frequency, extrapolate).rate()
+                   for t in values.tolist())
+        else:
+            dayCount = qlu.getDayCountBasis(dayCount)
+            res = (ts.zeroRate(ql.Date(s), dayCount, compounding, frequency, extrapolate).rate()
+                   for s in values.tolist())
+
+        return np.fromiter(res, dtype=np.float64, count=len(values))
+
+    def forwardRates(self, starts, ends, dayCount, compounding, frequency=ql.Annual, extrapolate=False):
+        isTime, starts = batchInput(starts)
+        isEndTime, ends = batchInput(ends)
+        if isTime != isEndTime or len(starts) != len(ends):
+            raise ValueError(
+                "Start and end inputs must be of the same kind and size")
+        compounding = qlu.getCompoundType(compounding)
+        frequency = qlu.getFrequency(frequency)
+        ts = self._term_struct
+        if isTime:
+            res = (ts.forwardRate(t1, t2, compounding, frequency, extrapolate).rate()
+                   for t1, t2 in zip(starts.tolist(), ends.tolist()))
+        else:
+            dayCount = qlu.getDayCountBasis(dayCount)
+            res = (ts.forwardRate(ql.Date(s1), ql.Date(s2), dayCount, compounding, frequency, extrapolate).rate()
+                   for s1, s2 in zip(starts.tolist(), ends.tolist()))
+
+        return np.fromiter(res, dtype=np.float64, count=len(starts))
+
+
+# returns (isTime, values): year fractions as a float64 array, or dates
+# (ql.Date, yyyymmdd or Excel serials) as an int64 array of Excel serials
+def batchInput(values):
+    if isinstance(values, ql.Date) or np.isscalar(values):
+        values = [values]
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = np.array([dt.serialNumber() if isinstance(dt, ql.Date) else dt
+                           for dt in values.tolist()])
+    if values.size == 0:
+        return False, values.astype(np.int64)
+
+    if values.dtype.kind == 'f' and np.any(values != np.floor(values)) \
+            or values.max() < 367:
+        return True, values.astype(np.float64)
+
+    return False, dfs.numbers2xlserials(values)
+
+
 def ZeroCurve(*args):
     crv = XZeroCurve(*args)
     return TermStructDecorator(crv)
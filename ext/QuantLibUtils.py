@@ -16,9 +16,26 @@ import os
 import json
 import QuantLib as ql
 from pathlib import Path
+from . import Instrumentation as inst
+from . import Config as cfg
+from .LRUCache import LRUCache
+from . import TenorParser as tp
 
 config = None
 
+# resolved config entries keyed by (table, upper-cased key). Enums and
+# classes are always shared; objects only for the tables below, whose
+# instances are immutable.
+resolved = {}
+SHARED_OBJECT_TABLES = ('DAY_COUNT_MAP', 'CCY_MAP',
+                        'INTERPOLATION_MAP', 'INTERPOLATION_METHOD_MAP')
+
+# market indices keyed by (name, tenor, forwarding curve handle). Fixings
+# are kept by QuantLib per index name, so they are shared anyway; sharing
+# the instances saves building them and their observers again.
+INDEX_CACHE_SIZE = 256
+indexCache = LRUCache(maxEntries=INDEX_CACHE_SIZE)
+
 
 def getThisDir():
 
@@ -44,9 +61,8 @@ def trimSuffix(xstring, suffix):
     return xstring
 
 
-def getMap(table):
+def loadConfig():
     global config
-    table = table.upper()
     if config is None:
         # cwd = os.getcwd()
         # print(cwd)
@@ -56,6 +72,12 @@ def getMap(table):
             # print("Loading ...")
             config = json.load(jsonFile)
 
+    return config
+
+
+def getMap(table):
+    table = table.upper()
+    config = loadConfig()
     # if config is None:
     #                 print("config is none")
 
@@ -81,8 +103,13 @@ def getRef(table, key, msg):
     if not isinstance(key, str):
         return key
 
-    val = getValue(table, key, msg)
-    ref = getattr(ql, val)
+    cacheKey = (table, key.upper())
+    ref = resolved.get(cacheKey)
+    if ref is None:
+        val = getValue(table, key, msg)
+        ref = getattr(ql, val)
+        resolved[cacheKey] = ref
+
     return ref
 
 
@@ -90,9 +117,60 @@ def getObject(table, key, msg):
     if not isinstance(key, str):
         return key
 
-    className = getValue(table, key, msg)
-    clazz = getattr(ql, className)
-    return clazz()
+    if table not in SHARED_OBJECT_TABLES:
+        return getRef(table, key, msg)()
+
+    cacheKey = (table, key.upper(), 'object')
+    obj = resolved.get(cacheKey)
+    if obj is None:
+        obj = getRef(table, key, msg)()
+        resolved[cacheKey] = obj
+
+    return obj
+
+
+# enum values given as 'Class.Member', e.g. DateGeneration.Backward
+def getNestedRef(table, key, msg):
+    cacheKey = (table, key.upper())
+    ref = resolved.get(cacheKey)
+    if ref is None:
+        val = getValue(table, key, msg)
+        tmp = val.split('.')
+        ref = getattr(getattr(ql, tmp[0]), tmp[1])
+        resolved[cacheKey] = ref
+
+    return ref
+
+
+NESTED_REF_TABLES = ('DATE_GEN_FLAG', 'POSITION')
+
+
+# resolves every entry of QuantLibConfig.json up front, so that latency
+# critical services don't pay for it on first use. Entries QuantLib can't
+# build without arguments (e.g. ActualActual in recent versions) are
+# skipped and returned as {(table, key): error message}.
+def preResolve(tables=None):
+    failures = {}
+    if tables is None:
+        tables = list(loadConfig().keys())
+
+    for table in tables:
+        for key in getMap(table).keys():
+            try:
+                if table in NESTED_REF_TABLES:
+                    getNestedRef(table, key, table)
+                else:
+                    getRef(table, key, table)
+                    if table in SHARED_OBJECT_TABLES:
+                        getObject(table, key, table)
+            except (AttributeError, TypeError, RuntimeError, ValueError) as e:
+                failures[(table, key)] = str(e)
+
+    return failures
+
+
+def clearResolved():
+    resolved.clear()
 
 
 def getCurrency(ccy):
@@ -106,53 +184,7 @@ def getFrequency(freq):
 
 
 def parseTenor(tenor):
-    if isinstance(tenor, ql.Period):
-        return tenor
-
-    if tenor.upper() == 'OTHERFREQUENCY':
-        raise RuntimeError('Unknown period:%s' % tenor)
-
-    nvp = getMap('FREQUENCY_MAP')
-    if tenor.upper() in nvp:
-        propertyName = nvp[tenor.upper()]
-        ref = getattr(ql, propertyName)
-        return ql.Period(ref)
-
-    tenor = tenor.upper().strip()
-    pos = 0
-    years = 0
-    months = 0
-    weeks = 0
-    days = 0
-    for i, c in enumerate(tenor):
-        if c in "YMWD":
-            # print("...........", tenor[pos:i], ',', tenor)
-            nbr = int(tenor[pos:i])
-            pos = i + 1
-            if c == 'Y':
-                years = nbr
-            elif c == 'M':
-                months = nbr
-            elif c == 'W':
-                weeks = nbr
-            else:
-                days = nbr
-
-    if years > 0 and months:  # convert to months
-        months += years * 12
-        years = 0
-
-    p = None
-    if years > 0:
-        p = ql.Period(years, ql.Years)
-    elif months > 0:
-        p = ql.Period(months, ql.Months)
-    elif weeks > 0:
-        p = ql.Period(weeks, ql.Weeks)
-    else:
-        p = ql.Period(days, ql.Days)
-
-    return p
+    return tp.parseTenor(tenor)
 
 
 def getTenor(name):
@@ -185,11 +217,7 @@ def getDateGenRule(name):
     if name.lower() == 'none':
         return None
 
-    val = getValue('DATE_GEN_FLAG', name, 'day generation rule')
-    tmp = val.split('.')
-    ref = getattr(ql, tmp[0])
-    rule = getattr(ref, tmp[1])
-    return rule
+    return getNestedRef('DATE_GEN_FLAG', name, 'day generation rule')
 
 
 def getPositionType(ptype):
@@ -203,10 +231,7 @@ def getPositionType(ptype):
     if not isinstance(ptype, str):
         raise RuntimeError("Invalid position type")
 
-    val = getValue('POSITION', ptype, 'position type')
-    tmp = val.split('.')
-    ref = getattr(ql, tmp[0])
-    return getattr(ref, tmp[1])
+    return getNestedRef('POSITION', ptype, 'position type')
 
 
 def getCompoundType(ctype):
@@ -234,15 +259,44 @@ def getInterpolationMethod(key):
     return getObject('INTERPOLATION_METHOD_MAP', key, 'interpolation')
 
 
-def getMarketIndex(key):
+def getMarketIndex(key, forwardingCurve=None):
+    if not isinstance(key, str):
+        return key
+
     temp = key.split(',')
-    ref = getRef('MARKET_INDEX_MAP', temp[0].strip(), 'market index')
-    if len(temp) == 1:
-        return ref()
-    else:
+    name = temp[0].strip().upper()
+    tenor = None
+    tenorKey = None
+    if len(temp) > 1:
         tenor = parseTenor(temp[1].strip())
-        # print(tenor, type(tenor))
-        return ref(tenor)
+        tenorKey = (tenor.length(), tenor.units())
+    handleKey = None if forwardingCurve is None else id(forwardingCurve)
+
+    cacheKey = (name, tenorKey, handleKey)
+    entry = indexCache.get(cacheKey)
+    if entry is not None:
+        inst.count('index.hits')
+        return entry[0]
+
+    inst.count('index.misses')
+    ref = getRef('MARKET_INDEX_MAP', name, 'market index')
+    args = [] if tenor is None else [tenor]
+    if forwardingCurve is not None:
+        args.append(forwardingCurve)
+    index = ref(*args)
+    # the handle is kept with the index so that its id can't be reused
+    indexCache.put(cacheKey, (index, forwardingCurve))
+
+    return index
+
+
+def setIndexCachePolicy(maxEntries=INDEX_CACHE_SIZE, ttl=None):
+    global indexCache
+    indexCache = LRUCache(maxEntries=maxEntries, ttl=ttl)
+
+
+def clearIndexCache():
+    indexCache.clear()
 
 
 def getTermStructureHandle(key):
@@ -279,3 +333,7 @@ def getPricingEngine(key, curveHandle=None):
 
 # def setEvalDate(dt):
 #     ql.Settings.instance().evaluationDate = toQLDate(dt)
+
+
+if cfg.isPreResolveEnabled():
+    preResolve()
@@ -13,36 +13,48 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 
-import os
-import sqlite3
+from . import Utils as utils
+from .SQLiteLoader import SQLiteLoader, MAX_PARAMS
 
-from . import Config as config
-from .DataLoader import DataLoader
 
-
-class SQLiteCalendarLoader(DataLoader):
-    def __init__(self, *args, **kargs):
-        super().__init__(*args, **kargs)
-
-    def getDBDir(self):
-        dbDir = os.getenv('DB_DIR', None)
-        if dbDir is None:
-            dbDir = os.path.join(config.getParentDir(), 'db')
-
-        return dbDir
-
-    def makeConnection(self):
-        dbPath = os.path.join(self.getDBDir(), 'quantlib.db')
-        conn = sqlite3.connect(dbPath)
-
-        return conn
+class SQLiteCalendarLoader(SQLiteLoader):
+    # creates the calCode index when the database was created without
+    # the UNIQUE (calCode, date) constraint, which already provides one
+    def createIndexes(self):
+        self.executeScript(
+            'CREATE INDEX IF NOT EXISTS idx_calendars_calCode ON calendars (calCode)')
 
     def load(self, calName):
-        conn = self.makeConnection()
-        params = (calName,)
-        c = conn.cursor()
-        recs = c.execute('SELECT date FROM calendars WHERE calCode=?', params)
-        dates = [int(d[0]) for d in recs]
-        conn.close()
-
-        return dates
+        return self.loadMany([calName])[calName]
+
+    # holidays of several calendars in one query per MAX_PARAMS codes;
+    # codes are matched case-insensitively
+    def loadMany(self, calNames):
+        calNames = list(calNames)
+        holidays = {calName: [] for calName in calNames}
+        requested = utils.requestedCodes(calNames)
+        codes = list(requested.keys())
+        with self.lock:
+            c = self.getConnection().cursor()
+            for i in range(0, len(codes), MAX_PARAMS):
+                params = tuple(codes[i:i + MAX_PARAMS])
+                recs = c.execute(
+                    """SELECT calCode, date
+                       FROM calendars
+                       WHERE calCode IN (%s)
+                       ORDER BY calCode, date""" % ','.join('?' * len(params)), params)
+                for calCode, date in recs:
+                    for calName in requested.get(calCode.upper(), []):
+                        holidays[calName].append(int(date))
+            c.close()
+
+        return holidays
+
+    def listIds(self):
+        with self.lock:
+            c = self.getConnection().cursor()
+            recs = c.execute('SELECT DISTINCT calCode FROM calendars')
+            calNames = [row[0] for row in recs]
+            c.close()
+
+        return calNames
@@ -0,0 +1,84 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+import os
+import sqlite3
+import threading
+
+from . import Config as config
+from .DataLoader import DataLoader
+
+try:
+    from urllib.request import pathname2url
+except ImportError:
+    from urllib import pathname2url
+
+# SQLite's default limit on host parameters is 999
+MAX_PARAMS = 500
+
+
+class SQLiteLoader(DataLoader):
+    # Base of the loaders reading db/quantlib.db (or $DB_DIR/quantlib.db).
+    # The loader keeps one read-only connection, shared by all the threads
+    # using it, until close() is called. With immutable=True SQLite skips
+    # all locking, which is only safe while nobody writes to the database.
+    def __init__(self, *args, immutable=True, **kargs):
+        super().__init__(*args, **kargs)
+        self.immutable = immutable
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def getDBDir(self):
+        dbDir = os.getenv('DB_DIR', None)
+        if dbDir is None:
+            dbDir = os.path.join(config.getParentDir(), 'db')
+
+        return dbDir
+
+    def getDBPath(self):
+        return os.path.join(self.getDBDir(), 'quantlib.db')
+
+    def makeConnection(self):
+        uri = 'file:%s?mode=ro' % pathname2url(self.getDBPath())
+        if self.immutable:
+            uri += '&immutable=1'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+        return conn
+
+    def getConnection(self):
+        if self.conn is None:
+            self.conn = self.makeConnection()
+
+        return self.conn
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # runs DDL statements through a separate read-write connection
+    def executeScript(self, *statements):
+        conn = sqlite3.connect(self.getDBPath())
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
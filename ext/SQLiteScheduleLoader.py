@@ -13,57 +13,64 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 
-import os
-import sqlite3
-# import json
+from .SQLiteLoader import SQLiteLoader, MAX_PARAMS
 
-from . import Config as config
-from .DataLoader import DataLoader
 
+class SQLiteScheduleLoader(SQLiteLoader):
+    # creates the prodCode indexes when the database was created without
+    # the UNIQUE constraints, which already provide them
+    def createIndexes(self):
+        self.executeScript(
+            'CREATE INDEX IF NOT EXISTS idx_schedules_prodCode ON schedules (prodCode)',
+            'CREATE INDEX IF NOT EXISTS idx_schedule_dates_prodCode ON schedule_dates (prodCode)')
 
-class SQLiteScheduleLoader(DataLoader):
-    def __init__(self, *args, **kargs):
-        super().__init__(*args, **kargs)
-
-    def getDBDir(self):
-        dbDir = os.getenv('DB_DIR', None)
-        if dbDir is None:
-            dbDir = os.path.join(config.getParentDir(), 'db')
-
-        return dbDir
+    def load(self, prodCode):
+        schedules = self.loadMany([prodCode])
+        if prodCode not in schedules:
+            raise RuntimeError("schedue for %s was not found" % prodCode)
 
-    def makeConnection(self):
-        dbPath = os.path.join(self.getDBDir(), 'quantlib.db')
-        conn = sqlite3.connect(dbPath)
+        return schedules[prodCode]
 
-        return conn
+    # schedules of several products, two queries per MAX_PARAMS codes.
+    # Products without a schedule are left out of the result.
+    def loadMany(self, prodCodes):
+        prodCodes = list(prodCodes)
+        schedules = {}
+        with self.lock:
+            c = self.getConnection().cursor()
+            for i in range(0, len(prodCodes), MAX_PARAMS):
+                params = tuple(prodCodes[i:i + MAX_PARAMS])
+                marks = ','.join('?' * len(params))
+                # https://docs.python.org/3/library/sqlite3.html
+                recs = c.execute(
+                    """SELECT prodCode, rolling, calendar
+                       FROM schedules
+                       WHERE prodCode IN (%s)""" % marks, params)
+                for prodCode, rolling, calendar in recs:
+                    schedules[prodCode] = {
+                        'prodCode': prodCode,
+                        'rolling': rolling,
+                        'calendar': calendar,
+                        'dates': []
+                    }
 
-    def load(self, prodCode):
-        conn = self.makeConnection()
-        params = (prodCode,)
-        c = conn.cursor()
-        # https://docs.python.org/3/library/sqlite3.html
-        c.execute(
-            """SELECT rolling, calendar
-               FROM schedules
-               WHERE prodCode=?""", params)
-        rec = c.fetchone()
-        if rec is None:
-            raise RuntimeError("schedue for %s was not found" % prodCode)
-        c.execute(
-            """SELECT date
-               FROM schedule_dates
-               WHERE prodCode=?""", params)
-        rows = c.fetchall()
+                recs = c.execute(
+                    """SELECT prodCode, date
+                       FROM schedule_dates
+                       WHERE prodCode IN (%s)
+                       ORDER BY prodCode, date""" % marks, params)
+                for prodCode, date in recs:
+                    if prodCode in schedules:
+                        schedules[prodCode]['dates'].append(date)
+            c.close()
 
-        # schedule = json.loads(rec[0])
-        # conn.close()
+        return schedules
 
-        schedule = {
-            'prodCode': prodCode,
-            'rolling': rec[0],
-            'calendar': rec[1],
-            'dates': [dt[0] for dt in rows]
-        }
+    def listIds(self):
+        with self.lock:
+            c = self.getConnection().cursor()
+            recs = c.execute('SELECT DISTINCT prodCode FROM schedules')
+            prodIds = [row[0] for row in recs]
+            c.close()
 
-        return schedule
+        return prodIds
@@ -12,16 +12,31 @@
 # ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
+import threading
 import QuantLib as ql
 from . import QuantLibClassExt as qlx
+from . import Utils as utils
 
 from .URLScheduleLoader import URLScheduleLoader
+from .LRUCache import LRUCache
+
+
+# rough memory footprint of a Schedule, used by the cache policy
+def scheduleBytes(schedule):
+    return 512 + 64 * len(schedule)
+
+
+# products sharing dates and conventions share one Schedule
+def scheduleKey(data):
+    return (tuple(data["dates"]), data["calendar"], data["rolling"],
+            data.get("term_rolling"), data.get("tenor"))
 
 
 class ScheduleManager:
     class __ScheduleManager:
         def __init__(self, loader=None):
-            self.scheduleCache = {}
+            self.scheduleCache = LRUCache(sizeOf=scheduleBytes)
+            self.buildLocks = utils.KeyedLocks()
             if loader is None:
                 self.loader = URLScheduleLoader()
             else:
@@ -33,11 +48,26 @@ class ScheduleManager:
         def getLoader(self):
             return self.loader
 
-        def createSchedule(self, prodId):
-            data = self.loader.load(prodId)
+        # re-bounds the cache, keeping its entries and stats
+        def setCachePolicy(self, maxEntries=None, maxBytes=None, ttl=None):
+            self.scheduleCache.setPolicy(maxEntries, maxBytes, ttl)
+
+        def getCacheStats(self):
+            return self.scheduleCache.stats()
+
+        def evictSchedule(self, prodId):
+            return self.scheduleCache.pop(prodId.upper())
+
+        def createSchedule(self, prodId, data=None):
+            if data is None:
+                data = self.loader.load(prodId)
             # print(data)
-            schedule = qlx.Schedule(
-                data["dates"], data["calendar"], data["rolling"], data["term_rolling"], data["tenor"], None, False)
+            if "term_rolling" in data:
+                schedule = qlx.Schedule(
+                    data["dates"], data["calendar"], data["rolling"], data["term_rolling"], data["tenor"], None, False)
+            else:  # database loaders only store the dates, calendar and rolling
+                schedule = qlx.Schedule(
+                    data["dates"], data["calendar"], data["rolling"])
             return schedule
 
         def getSchedule(self, prodId):
@@ -45,26 +75,96 @@ class ScheduleManager:
                 return prodId
 
             prodId = prodId.upper()
-            if prodId in self.scheduleCache:
-                return self.scheduleCache[prodId]
-
-            schedule = self.createSchedule(prodId)
-
+            schedule = self.scheduleCache.get(prodId)
             if schedule is not None:
-                self.scheduleCache[prodId] = schedule
-
-            return schedule
+                return schedule
+
+            # only one thread builds a given schedule, the others wait for it
+            with self.buildLocks.hold(prodId):
+                schedule = self.scheduleCache.peek(prodId)
+                if schedule is not None:
+                    return schedule
+
+                schedule = self.createSchedule(prodId)
+
+                if schedule is not None:
+                    self.scheduleCache.put(prodId, schedule)
+
+                return schedule
+
+        # loads the given schedules, all the ones known to the loader by
+        # default, and returns the time spent per product id
+        def preload(self, prodIds=None, parallel=True, maxWorkers=None):
+            if prodIds is None:
+                prodIds = self.loader.listIds()
+            prodIds = [prodId.upper() for prodId in prodIds]
+
+            # loaders able to do it fetch all the schedules at once
+            data = {}
+            if hasattr(self.loader, 'loadMany'):
+                data = self.loader.loadMany(prodIds)
+
+            def load(prodId):
+                if prodId in data:
+                    with self.buildLocks.hold(prodId):
+                        if self.scheduleCache.peek(prodId) is None:
+                            self.scheduleCache.put(
+                                prodId, self.createSchedule(prodId, data[prodId]))
+                return self.getSchedule(prodId)
+
+            return utils.timedCalls(load, prodIds, parallel, maxWorkers)
+
+        # schedules of several products in the given order: the missing ones
+        # are fetched from the loader in one go (loadMany) and identical
+        # schedules are built once
+        def getSchedules(self, prodIds):
+            prodIds = [prodId.upper() for prodId in prodIds]
+            schedules = {}
+            for prodId in prodIds:
+                schedule = self.scheduleCache.get(prodId)
+                if schedule is not None:
+                    schedules[prodId] = schedule
+
+            missing = list(dict.fromkeys(
+                prodId for prodId in prodIds if prodId not in schedules))
+            if len(missing) > 0:
+                if hasattr(self.loader, 'loadMany'):
+                    data = self.loader.loadMany(missing)
+                else:
+                    data = {prodId: self.loader.load(prodId) for prodId in missing}
+
+                built = {}
+                for prodId in missing:
+                    if data.get(prodId) is None:
+                        raise RuntimeError("schedule for %s was not found" % prodId)
+                    # single-flight with getSchedule/preload: keep a schedule
+                    # another thread built meanwhile
+                    with self.buildLocks.hold(prodId):
+                        schedule = self.scheduleCache.peek(prodId)
+                        if schedule is None:
+                            key = scheduleKey(data[prodId])
+                            if key not in built:
+                                built[key] = self.createSchedule(prodId, data[prodId])
+                            schedule = built[key]
+                            self.scheduleCache.put(prodId, schedule)
+                    schedules[prodId] = schedule
+
+            return [schedules[prodId] for prodId in prodIds]
 
         def __str__(self):
             return repr(self) + 'Impl of ScheduleManager'
 
     instance = None
+    lock = threading.Lock()
 
     def __init__(self, loader=None):
         if not ScheduleManager.instance:
-            ScheduleManager.instance = ScheduleManager.__ScheduleManager(
-                loader)
-        elif loader is not None:
+            with ScheduleManager.lock:
+                if not ScheduleManager.instance:
+                    ScheduleManager.instance = ScheduleManager.__ScheduleManager(
+                        loader)
+                    return
+        if loader is not None:
             ScheduleManager.instance.setLoader(loader)
 
     def __getattr__(self, name):
@@ -75,6 +175,21 @@ def setLoader(loader):
     _ = ScheduleManager(loader)
 
 
+def setCachePolicy(maxEntries=None, maxBytes=None, ttl=None):
+    mgr = ScheduleManager()
+    mgr.setCachePolicy(maxEntries, maxBytes, ttl)
+
+
 def getSchedule(prodId):
     mgr = ScheduleManager()
     return mgr.getSchedule(prodId)
+
+
+def getSchedules(prodIds):
+    mgr = ScheduleManager()
+    return mgr.getSchedules(prodIds)
+
+
+def preload(prodIds=None, parallel=True, maxWorkers=None):
+    mgr = ScheduleManager()
+    return mgr.preload(prodIds, parallel, maxWorkers)
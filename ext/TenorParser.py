@@ -0,0 +1,75 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+# The tenor parser shared by DatetimeUtils and QuantLibUtils. Accepted are
+# 'NONE' (None), frequency names of QuantLibConfig.json ('Semiannual') and
+# signed amounts of Y/M/W/D, e.g. '6M', '-2D' or '1Y6M' (18 months). Of a
+# mixed tenor the largest unit wins, except that years and months add up
+# as months.
+# Parsed tenors are memoized; ql.Period is immutable, so they are shared.
+
+import re
+from functools import lru_cache
+import QuantLib as ql
+from . import QuantLibUtils as qlu
+
+TENOR_CACHE_SIZE = 1024
+TENOR_PATTERN = re.compile(r'(?:\s*[+-]?\d+\s*[YMWD])+')
+TENOR_PART = re.compile(r'([+-]?\d+)\s*([YMWD])')
+
+
+@lru_cache(maxsize=TENOR_CACHE_SIZE)
+def parseNormalized(tenor):
+    if tenor == 'NONE':
+        return None
+
+    if tenor == 'OTHERFREQUENCY':
+        raise RuntimeError('Unknown period:%s' % tenor)
+
+    nvp = qlu.getMap('FREQUENCY_MAP')
+    if tenor in nvp:
+        return ql.Period(getattr(ql, nvp[tenor]))
+
+    if TENOR_PATTERN.fullmatch(tenor) is None:
+        raise ValueError('Invalid tenor:%s' % tenor)
+
+    amounts = {'Y': 0, 'M': 0, 'W': 0, 'D': 0}
+    for nbr, unit in TENOR_PART.findall(tenor):
+        amounts[unit] = int(nbr)
+
+    if amounts['Y'] and amounts['M']:  # convert to months
+        return ql.Period(amounts['M'] + amounts['Y'] * 12, ql.Months)
+    if amounts['Y']:
+        return ql.Period(amounts['Y'], ql.Years)
+    if amounts['M']:
+        return ql.Period(amounts['M'], ql.Months)
+    if amounts['W']:
+        return ql.Period(amounts['W'], ql.Weeks)
+
+    return ql.Period(amounts['D'], ql.Days)
+
+
+def parseTenor(tenor):
+    if isinstance(tenor, ql.Period):
+        return tenor
+
+    return parseNormalized(tenor.upper().strip())
+
+
+def parseTenors(tenors):
+    return [parseTenor(tenor) for tenor in tenors]
+
+
+def clearCache():
+    parseNormalized.cache_clear()
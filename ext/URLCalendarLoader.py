@@ -17,6 +17,7 @@ import os
 
 from . import Config as config
 from . import Utils as utils
+from . import CalendarCache as calCache
 from .DataLoader import DataLoader
 from .CalendarIndex import CalendarIndex
 
@@ -35,7 +36,16 @@ class URLCalendarLoader(DataLoader):
         else:
             url = 'file:///' + os.path.join(config.getCalendarDir(), calUrl)
 
+        path = utils.urlToPath(url)
+        if path is not None and config.isCalendarCacheEnabled():
+            return calCache.loadHolidays(path, parseCalendarFile)
+
         res = utils.loadCSVFromUrl(url)
         dates = [int(d[0]) for d in res]
 
         return dates
+
+
+def parseCalendarFile(path):
+    res = utils.loadCSVFromFile(path)
+    return [int(d[0]) for d in res]
@@ -13,6 +13,8 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 
+import glob
+
 from . import Config as config
 from . import Utils as utils
 from .DataLoader import DataLoader
@@ -56,3 +58,19 @@ class URLScheduleLoader(DataLoader):
         data = self.loadScheduleFile(prodId, url)
         # dates = [dfs.toQLDate(dt) for dt in data["dates"]]
         return data
+
+    def listIds(self):
+        if self.scheduleUrl is None:
+            self.scheduleUrl = self.getScheduleURL(None)
+
+        path = utils.urlToPath(self.scheduleUrl)
+        if path is None:
+            raise RuntimeError(
+                "Schedules cannot be listed from %s" % self.scheduleUrl)
+
+        prefix, suffix = path.split('{0}')
+        prodIds = []
+        for fileName in glob.glob(prefix + '*' + suffix):
+            prodIds.append(fileName[len(prefix):len(fileName) - len(suffix)])
+
+        return sorted(prodIds)
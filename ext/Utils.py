@@ -13,15 +13,21 @@
 # FOR A PARTICULAR PURPOSE.  See the license for more details.
 
 
+import os
 import csv
 import json
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     # For Python 3.0 and later
-    from urllib.request import urlopen
+    from urllib.request import urlopen, url2pathname
 except ImportError:
     # Fall back to Python 2's urllib2
     from urllib2 import urlopen
+    from urllib import url2pathname
 
 try:
     # for Python 2.x
@@ -50,3 +56,80 @@ def loadJsonFromUrl(url):
 def loadCSVFromUrl(url, delimiter=','):
     content = readFromUrl(url)
     return parseCSVString(content, delimiter)
+
+
+def loadCSVFromFile(path, delimiter=','):
+    with open(path, 'rb') as f:
+        content = f.read()
+    return parseCSVString(content.decode("utf-8"), delimiter)
+
+
+# local file system path of a file: url (or a plain path), None otherwise
+def urlToPath(url):
+    if url.startswith('file:'):
+        path = url2pathname(url[len('file:'):])
+        if os.name != 'nt':
+            path = '/' + path.lstrip('/')
+        return path
+
+    if url.startswith('http:') or url.startswith('https:'):
+        return None
+
+    return url
+
+
+# calls func(key) for every key, on a thread pool when parallel is True,
+# and returns {key: {'seconds': elapsed, 'error': None or message}}
+def timedCalls(func, keys, parallel=True, maxWorkers=None):
+    def timedCall(key):
+        start = time.perf_counter()
+        error = None
+        try:
+            func(key)
+        except Exception as e:
+            error = str(e)
+        return key, {'seconds': time.perf_counter() - start, 'error': error}
+
+    keys = list(keys)
+    if parallel and len(keys) > 1:
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            stats = list(executor.map(timedCall, keys))
+    else:
+        stats = [timedCall(key) for key in keys]
+
+    return dict(stats)
+
+
+# upper-cased code -> the codes as requested, to map database rows back to
+# the requested codes whatever the case the database returns them in
+def requestedCodes(codes):
+    lookup = {}
+    for code in codes:
+        lookup.setdefault(code.upper(), []).append(code)
+
+    return lookup
+
+
+# one re-entrant lock per key, created on demand and dropped once no
+# thread holds or waits for it. Used to build each cache entry only once
+# when several threads ask for the same key at the same time.
+class KeyedLocks(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    @contextmanager
+    def hold(self, key):
+        with self.lock:
+            entry = self.locks.get(key)
+            if entry is None:
+                entry = self.locks[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.locks[key]
@@ -0,0 +1,87 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+
+# The compiled calendars against QuantLib's own businessDaysBetween and
+# advance, for database calendars and for QuantLib built-in calendars.
+
+import numpy as np
+import pytest
+import QuantLib as ql
+from ext import CalendarManager as mgr
+from ext.CompiledCalendar import CompiledCalendar
+
+START = ql.Date(1, ql.January, 2015).serialNumber()
+END = ql.Date(31, ql.December, 2025).serialNumber()
+STEP = 13
+OFFSETS = [-25, -1, 0, 1, 2, 5, 30]
+
+
+def calendars():
+    return [('TGT', mgr.getCalendar('TGT'), mgr.getCompiledCalendar('TGT')),
+            ('USD', mgr.getCalendar('USD'), mgr.getCompiledCalendar('USD')),
+            ('TARGET', ql.TARGET(), CompiledCalendar.fromCalendar(ql.TARGET())),
+            ('NYSE', ql.UnitedStates(ql.UnitedStates.NYSE),
+             CompiledCalendar.fromCalendar(ql.UnitedStates(ql.UnitedStates.NYSE)))]
+
+
+@pytest.fixture(scope='module', params=calendars(), ids=lambda c: c[0])
+def calendar(request):
+    return request.param[1:]
+
+
+def test_isBusinessDay(calendar):
+    cal, compiled = calendar
+    serials = np.arange(START, END)
+    expected = [cal.isBusinessDay(ql.Date(s)) for s in serials.tolist()]
+    assert compiled.isBusinessDay(serials).tolist() == expected
+
+
+@pytest.mark.parametrize('n', OFFSETS)
+def test_advance(calendar, n):
+    cal, compiled = calendar
+    serials = np.arange(START, END, STEP)
+    expected = [cal.advance(ql.Date(s), n, ql.Days).serialNumber()
+                for s in serials.tolist()]
+    assert compiled.advance(serials, n).tolist() == expected
+
+
+def test_advance_scalar(calendar):
+    cal, compiled = calendar
+    dt = ql.Date(24, ql.December, 2021)
+    assert compiled.advance(dt, 3) == cal.advance(dt, 3, ql.Days)
+    assert compiled.advance(20211224, -3) == \
+        cal.advance(dt, -3, ql.Days).serialNumber()
+
+
+@pytest.mark.parametrize('includeFirst', [True, False])
+@pytest.mark.parametrize('includeLast', [True, False])
+def test_businessDaysBetween(calendar, includeFirst, includeLast):
+    cal, compiled = calendar
+    froms = np.arange(START, END, STEP)
+    for days in [0, 1, 6, 45, 400, -3, -90]:
+        tos = froms + days
+        expected = [cal.businessDaysBetween(ql.Date(f), ql.Date(t),
+                                            includeFirst, includeLast)
+                    for f, t in zip(froms.tolist(), tos.tolist())]
+        assert compiled.businessDaysBetween(froms, tos, includeFirst,
+                                            includeLast).tolist() == expected
+
+
+def test_outOfRange():
+    compiled = mgr.getCompiledCalendar('TGT')
+    with pytest.raises(ValueError):
+        compiled.isBusinessDay(366)
+    with pytest.raises(ValueError):
+        compiled.advance(109574, 5)
@@ -0,0 +1,95 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+
+# The integer date arithmetic of DatetimeUtils against datetime and
+# QuantLib, over the whole QuantLib date range [1901-01-01, 2199-12-31].
+
+import datetime
+import numpy as np
+import pytest
+import QuantLib as ql
+from ext import DatetimeUtils as dfs
+
+EPOCH = datetime.date(1970, 1, 1)
+FIRST = datetime.date(1901, 1, 1)
+LAST = datetime.date(2199, 12, 31)
+
+
+def allDates():
+    return [FIRST + datetime.timedelta(days=i)
+            for i in range((LAST - FIRST).days + 1)]
+
+
+def toYMD(dt):
+    return dt.year * 10000 + dt.month * 100 + dt.day
+
+
+def test_daysFromCivil():
+    for dt in allDates():
+        assert dfs.daysFromCivil(dt.year, dt.month, dt.day) == (dt - EPOCH).days
+
+
+def test_civilFromDays():
+    for dt in allDates():
+        assert dfs.civilFromDays((dt - EPOCH).days) == (dt.year, dt.month, dt.day)
+
+
+@pytest.mark.parametrize('y, m, d', [(1600, 2, 29), (1, 1, 1), (9999, 12, 31)])
+def test_outsideQuantLibRange(y, m, d):
+    days = (datetime.date(y, m, d) - EPOCH).days
+    assert dfs.daysFromCivil(y, m, d) == days
+    assert dfs.civilFromDays(days) == (y, m, d)
+
+
+def test_scalarConversions():
+    for dt in allDates()[::7]:
+        serial = ql.Date(dt.day, dt.month, dt.year).serialNumber()
+        assert dfs.yyyymmdd2xlserial(toYMD(dt)) == serial
+        assert dfs.xlserial2yyyymmdd(serial) == toYMD(dt)
+        assert dfs.number2xlserial(toYMD(dt)) == serial
+        assert dfs.number2yyyymmdd(serial) == toYMD(dt)
+
+
+def test_arrayConversions():
+    dates = allDates()
+    ymds = np.array([toYMD(dt) for dt in dates])
+    serials = np.array([(dt - EPOCH).days for dt in dates]) + dfs.EPOCH_XLSERIAL
+    dt64s = np.array(dates, dtype='datetime64[D]')
+
+    # arrays agree with the scalar versions element-wise
+    assert np.array_equal(dfs.yyyymmdds2xlserials(ymds), serials)
+    assert np.array_equal(dfs.xlserials2yyyymmdds(serials), ymds)
+    assert np.array_equal(dfs.xlserials2datetime64s(serials), dt64s)
+    assert np.array_equal(dfs.datetime64s2xlserials(dt64s), serials)
+    assert np.array_equal(dfs.yyyymmdds2datetime64s(ymds), dt64s)
+    assert np.array_equal(dfs.datetime64s2yyyymmdds(dt64s), ymds)
+
+    mixed = np.where(np.arange(len(ymds)) % 2 == 0, ymds, serials)
+    assert np.array_equal(dfs.numbers2xlserials(mixed), serials)
+    assert np.array_equal(dfs.numbers2yyyymmdds(mixed), ymds)
+
+
+def test_invalidYYYYMMDD():
+    with pytest.raises(ValueError):
+        dfs.yyyymmdds2xlserials([20200101, 20201301])
+    with pytest.raises(ValueError):
+        dfs.number2xlserial(20200132)
+
+
+def test_toQLDate():
+    for dt in allDates()[::31]:
+        qlDate = ql.Date(dt.day, dt.month, dt.year)
+        assert dfs.toQLDate(toYMD(dt)) == qlDate
+        assert dfs.toQLDate(qlDate.serialNumber()) == qlDate
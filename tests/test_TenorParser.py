@@ -0,0 +1,91 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+
+import pytest
+import QuantLib as ql
+from ext import TenorParser as tp
+from ext import DatetimeUtils as dfs
+
+
+def period(tenor):
+    p = tp.parseTenor(tenor)
+    return p.length(), p.units()
+
+
+@pytest.mark.parametrize('tenor, length, units', [
+    ('1D', 1, ql.Days),
+    ('2w', 2, ql.Weeks),
+    ('6M', 6, ql.Months),
+    (' 10Y ', 10, ql.Years),
+    ('+3M', 3, ql.Months),
+    ('-2D', -2, ql.Days),
+    ('-6M', -6, ql.Months),
+    ('-1Y', -1, ql.Years),
+    ('0D', 0, ql.Days),
+    ('1Y6M', 18, ql.Months),
+    ('-1Y-6M', -18, ql.Months),
+    ('2Y3W', 2, ql.Years),
+    ('1W3D', 1, ql.Weeks),
+])
+def test_amounts(tenor, length, units):
+    assert period(tenor) == (length, units)
+
+
+@pytest.mark.parametrize('tenor', ['1D', '2W', '6M', '10Y', '-2D', '-6M', '-1Y'])
+def test_sameAsQuantLib(tenor):
+    n, unit = int(tenor[:-1]), tenor[-1]
+    units = {'D': ql.Days, 'W': ql.Weeks, 'M': ql.Months, 'Y': ql.Years}[unit]
+    assert tp.parseTenor(tenor) == ql.Period(n, units)
+    dt = ql.Date(31, ql.January, 2020)
+    assert dt + tp.parseTenor(tenor) == dt + ql.Period(n, units)
+
+
+@pytest.mark.parametrize('tenor, freq', [
+    ('Annual', ql.Annual),
+    ('semiannual', ql.Semiannual),
+    ('QUARTERLY', ql.Quarterly),
+    ('Monthly', ql.Monthly),
+    ('Weekly', ql.Weekly),
+])
+def test_frequencies(tenor, freq):
+    assert tp.parseTenor(tenor) == ql.Period(freq)
+
+
+def test_none():
+    assert tp.parseTenor('None') is None
+
+
+def test_period():
+    p = ql.Period(3, ql.Months)
+    assert tp.parseTenor(p) is p
+
+
+@pytest.mark.parametrize('tenor', ['', 'M', '6', '6X', '1.5Y', '6M!', 'Y6'])
+def test_invalid(tenor):
+    with pytest.raises(ValueError):
+        tp.parseTenor(tenor)
+
+
+def test_otherFrequency():
+    with pytest.raises(RuntimeError):
+        tp.parseTenor('OtherFrequency')
+
+
+def test_wrappers():
+    assert tp.parseTenors(['1M', '-1M']) == \
+        [ql.Period(1, ql.Months), ql.Period(-1, ql.Months)]
+    assert dfs.parseTenor('-6M') == ql.Period(-6, ql.Months)
+    assert dfs.tenor2period('3w') == ql.Period(3, ql.Weeks)
+    assert dfs.tenor2period('Annual') is None
@@ -0,0 +1,90 @@
+# Copyright (C) 2019 Wenhua Wang
+#
+# This file is part of QuantLibExt, which is an extension to the
+# free-software/open-source quantitative library QuantLib - http://quantlib.org/
+#
+# QuantLibExt is free software: you can redistribute it and/or modify it
+# under the terms of the BSD license.
+#
+# QuantLib's license is at <http://quantlib.org/license.shtml>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the license for more details.
+
+
+# The batched curve queries of TermStructDecorator against one QuantLib
+# call per date, and the snapshots sampled through them.
+
+import numpy as np
+import pytest
+import QuantLib as ql
+from ext import CurveBuilder as builder
+from ext import CurveReqLoaders as loaders
+from ext import CurveSnapshot as cs
+from ext import DatetimeUtils as dfs
+
+AS_OF = 20121211
+
+
+@pytest.fixture(scope='module')
+def instruments():
+    return loaders.FileCurveReqLoader().load('eonia')
+
+
+@pytest.fixture(scope='module', params=['PiecewiseLogCubicDiscount',
+                                        'PiecewiseLinearZero',
+                                        'PiecewiseFlatForward'])
+def curve(request, instruments):
+    return builder.buildCurve(request.param, AS_OF, 'Act/365F', instruments,
+                              useCache=False)
+
+
+def sampleSerials(curve):
+    start = curve.referenceDate().serialNumber()
+    return np.arange(start, curve.maxDate().serialNumber() + 1, 3)
+
+
+def test_discounts_serials(curve):
+    serials = sampleSerials(curve)
+    expected = [curve.getTermStructure().discount(ql.Date(s))
+                for s in serials.tolist()]
+    assert np.array_equal(curve.discounts(serials), expected)
+
+
+def test_discounts_inputs(curve):
+    serials = sampleSerials(curve)[::50]
+    expected = curve.discounts(serials)
+    assert np.array_equal(curve.discounts(dfs.xlserials2yyyymmdds(serials)), expected)
+    assert np.array_equal(curve.discounts([ql.Date(s) for s in serials.tolist()]), expected)
+    assert np.array_equal(curve.discounts(serials.tolist()), expected)
+    assert curve.discounts(int(serials[1]))[0] == curve.discount(ql.Date(int(serials[1])))
+
+
+def test_discounts_times(curve):
+    times = np.linspace(0.01, 30.0, 500)
+    expected = [curve.discount(t) for t in times.tolist()]
+    assert np.array_equal(curve.discounts(times), expected)
+
+
+def test_discounts_extrapolate(curve):
+    end = curve.maxDate().serialNumber()
+    serials = np.arange(end, end + 400, 7)
+    expected = [curve.discount(ql.Date(s), True) for s in serials.tolist()]
+    assert np.array_equal(curve.discounts(serials, True), expected)
+
+
+def test_discounts_empty(curve):
+    assert curve.discounts([]).shape == (0,)
+
+
+def test_dailyDiscountSnapshot(instruments):
+    # turn of year jumps make the snapshot fall back to daily discounts
+    curve = builder.buildCurve('PiecewiseLogCubicDiscount', AS_OF, 'Act/365F',
+                               instruments, useCache=False)
+    assert curve.hasJumps
+    restored = cs.fromSnapshot(cs.toSnapshot(curve))
+    serials = np.arange(curve.referenceDate().serialNumber(),
+                        curve.maxDate().serialNumber() + 1)
+    expected = [curve.discount(ql.Date(s)) for s in serials.tolist()]
+    assert np.allclose(restored.discounts(serials), expected, rtol=0, atol=1e-12)